@@ -0,0 +1,301 @@
+import asyncio
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from json_codec import loads
+from bulk_upload import ChunkResult, chunked, DEFAULT_UPLOAD_WORKERS
+from openmeet_client import TRANSIENT_STATUS_CODES
+from importer import HytekDbImporter
+
+
+class AsyncResponse:
+    # The parts of a requests response the importer uses, filled from an aiohttp response
+
+    def __init__(self, status_code, content):
+        self.status_code = status_code
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+    def json(self):
+        return loads(self.content)
+
+
+class AsyncOpenMeetClient:
+    # Async front end to an OpenMeetClient. Uses aiohttp when it is installed, otherwise
+    # the pooled requests session is driven from worker threads.
+
+    def __init__(self, client, max_concurrency=DEFAULT_UPLOAD_WORKERS):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.session = None
+
+    async def __aenter__(self):
+        if aiohttp is not None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.client.timeout),
+                                                 connector=aiohttp.TCPConnector(limit=self.max_concurrency))
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def aiohttp_request(self, method, path, payload=None, params=None):
+        body = None
+        headers = {}
+        if payload is not None:
+            body, headers = self.client.encode_payload(payload)
+
+        response = await self.aiohttp_send(method, path, body, headers, params)
+
+        if self.client.compression_rejected(headers, response.status_code):
+            body, headers = self.client.encode_payload(payload, compress=False)
+            response = await self.aiohttp_send(method, path, body, headers, params)
+
+        return response
+
+    async def aiohttp_send(self, method, path, body, headers, params):
+        headers = dict(headers, Accept='application/json')
+        endpoint = self.client.endpoint_name(method, path)
+        url = self.client.base_url + path
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                async with self.session.request(method, url, data=body, params=params, headers=headers) as response:
+                    content = await response.read()
+                    received = int(response.headers.get('Content-Length', len(content)))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                self.client.record_latency(endpoint, time.perf_counter() - start)
+                # Connector errors happen before any of the request is sent
+                if not self.client.can_retry(method, attempt, not isinstance(e, aiohttp.ClientConnectorError)):
+                    raise
+            else:
+                self.client.record_latency(endpoint, time.perf_counter() - start)
+                self.client.record_transfer(endpoint, len(body) if body is not None else 0, received)
+                if response.status not in TRANSIENT_STATUS_CODES or not self.client.can_retry(method, attempt):
+                    return AsyncResponse(response.status, content)
+
+            await asyncio.sleep(self.client.backoff * (2 ** attempt))
+            attempt += 1
+
+    async def request(self, method, path, payload=None, params=None):
+        async with self.semaphore:
+            if self.session is None:
+                return await asyncio.to_thread(self.client.request, method, path, payload, params)
+            return await self.aiohttp_request(method, path, payload, params)
+
+    async def get(self, path, params=None):
+        return await self.request('GET', path, params=params)
+
+    async def post(self, path, payload):
+        return await self.request('POST', path, payload=payload)
+
+    async def put(self, path, payload):
+        return await self.request('PUT', path, payload=payload)
+
+    async def send_chunk(self, method, path, index, items):
+        try:
+            response = await self.request(method, path, payload=items)
+        except Exception as e:
+            return ChunkResult(index, items, error=e)
+        return ChunkResult(index, items, response=response)
+
+    async def upload(self, method, path, items, chunk_size):
+        chunks = enumerate(chunked(items, chunk_size))
+        results = []
+
+        # Each worker pulls the next chunk when it is free, so only max_concurrency chunks exist at once
+        async def worker():
+            for index, chunk in chunks:
+                results.append(await self.send_chunk(method, path, index, chunk))
+
+        await asyncio.gather(*(worker() for _ in range(self.max_concurrency)))
+
+        return sorted(results, key=lambda x: x.index)
+
+
+class Phase:
+
+    def __init__(self, name, run, depends_on=()):
+        self.name = name
+        self.run = run
+        self.depends_on = depends_on
+
+
+async def run_phases(phases, profile=None):
+    # Start every phase as soon as the phases it depends on have finished
+    tasks = {}
+
+    async def run_phase(phase, dependencies):
+        await asyncio.gather(*dependencies)
+        if profile is None:
+            return await phase.run()
+        with profile.phase(phase.name):
+            return await phase.run()
+
+    for phase in phases:
+        for dependency in phase.depends_on:
+            if dependency not in tasks:
+                raise ValueError('Phase %s depends on unknown or later phase %s' % (phase.name, dependency))
+
+        dependencies = [tasks[x] for x in phase.depends_on]
+        tasks[phase.name] = asyncio.ensure_future(run_phase(phase, dependencies))
+
+    await asyncio.gather(*tasks.values())
+
+    return {name: task.result() for name, task in tasks.items()}
+
+
+class AsyncHytekDbImporter(HytekDbImporter):
+    # Runs the import phases as a dependency graph so independent requests overlap
+
+    async def find_openmeet_meet_async(self, http, meet_create):
+        return self.read_openmeet_meet(await http.get('/meet', params={'meetname': meet_create['meetname']}))
+
+    async def create_openmeet_meet_async(self, http, meet_create):
+        return self.read_created_meet(await http.post('/meet', meet_create))
+
+    async def fetch_openmeet_teams_async(self, http):
+        method, path, payload = self.openmeet_teams_request()
+        return self.read_openmeet_teams(await http.request(method, path, payload=payload))
+
+    async def sync_teams_async(self, http, teams):
+        team_posts = self.team_posts(teams, await self.fetch_openmeet_teams_async(http))
+
+        # New athletes only ever belong to existing teams, so the two posts are independent
+        responses = await asyncio.gather(*(http.post(path, items) for description, path, items in team_posts))
+
+        for (description, path, items), r in zip(team_posts, responses):
+            self.check_team_post(description, r)
+
+    async def open_hytek_db_async(self):
+        state = {'failed_chunks': 0}
+        chunk_size = self.uploader.chunk_size
+
+        def sending():
+            return any(state[x] is not None for x in ['entry_rows', 'result_rows', 'relay_rows', 'relay_result_rows'])
+
+        async with AsyncOpenMeetClient(self.client, self.uploader.max_workers) as http:
+
+            async def extract():
+                if self.snapshot is None:
+                    await asyncio.to_thread(self.load_snapshot)
+
+            async def prepare():
+                # All of the local Hy-Tek work, so the network phases only wait on what they need
+                state['meet_create'] = self.get_meet_setup()
+
+                state['teams'] = self.get_teams()
+                self.get_athletes(state['teams'])
+
+            async def meet():
+                # The cached fingerprints only count when the meet they were saved against still exists
+                meet = await self.find_openmeet_meet_async(http, state['meet_create'])
+                state['digests'], changes = self.get_changes(state['meet_create'], meet)
+                state['changed'] = changes.any_changed()
+
+                state['teams'] = self.teams_to_sync(state['teams'], changes)
+                state['entry_rows'] = self.entry_rows_to_send(changes)
+                state['result_rows'] = self.result_rows_to_send(changes)
+                state['relay_rows'] = self.relay_rows_to_send(changes)
+                state['relay_result_rows'] = self.relay_result_rows_to_send(changes)
+
+                if not state['changed']:
+                    print('No changes since last import')
+                    return
+
+                if meet is None:
+                    meet = await self.create_openmeet_meet_async(http, state['meet_create'])
+
+                self.openmeet_meet = meet
+                self.openmeet_events = meet['events']
+
+            async def sync_teams():
+                if state['changed'] and state['teams'] is not None:
+                    if self.teams_view is not None:
+                        # A shared teams view serialises team changes across importers
+                        await asyncio.to_thread(self.sync_teams, state['teams'])
+                    else:
+                        await self.sync_teams_async(http, state['teams'])
+
+            async def openmeet_teams():
+                if state['changed'] and sending():
+                    if self.teams_view is not None:
+                        self.set_openmeet_teams(await asyncio.to_thread(self.teams_view.get))
+                    else:
+                        self.set_openmeet_teams(await self.fetch_openmeet_teams_async(http))
+
+            async def existing_entries():
+                if state['changed'] and sending():
+                    self.read_existing_entries(await http.get("/meet/%d/entries" % self.openmeet_meet['meet_id']))
+
+            async def entries():
+                if state['changed'] and state['entry_rows'] is not None:
+                    chunk_results = await http.upload('POST', "/meet/%s/entries" % self.openmeet_meet['meet_id'],
+                                                      self.get_entries(state['entry_rows']), chunk_size)
+                    state['failed_chunks'] += self.merge_created_entries(chunk_results)
+
+            async def entry_updates():
+                if state['changed'] and state['entry_rows'] is not None:
+                    chunk_results = await http.upload('PATCH', "/meet/%s/entries" % self.openmeet_meet['meet_id'],
+                                                      self.get_entry_updates(state['entry_rows']), chunk_size)
+                    state['failed_chunks'] += self.merge_updated_entries(chunk_results)
+
+            async def results():
+                if state['changed'] and state['result_rows'] is not None:
+                    chunk_results = await http.upload('PUT', "/meet/%s/results" % self.openmeet_meet['meet_id'],
+                                                      self.get_individual_results(state['result_rows']), chunk_size)
+                    state['failed_chunks'] += self.record_upload('results', chunk_results)
+
+            async def relays():
+                if state['changed'] and state['relay_rows'] is not None:
+                    relays_path = "/meet/%s/relays" % self.openmeet_meet['meet_id']
+                    self.read_existing_relays(await http.get(relays_path))
+
+                    chunk_results = await http.upload('POST', relays_path, self.get_relay_teams(state['relay_rows']),
+                                                      chunk_size)
+                    state['failed_chunks'] += self.merge_created_relays(chunk_results)
+
+                    chunk_results = await http.upload('PATCH', relays_path, self.get_relay_updates(state['relay_rows']),
+                                                      chunk_size)
+                    state['failed_chunks'] += self.merge_updated_relays(chunk_results)
+
+            async def relay_results():
+                if state['changed'] and state['relay_result_rows'] is not None:
+                    chunk_results = await http.upload('PUT', "/meet/%s/relays/results" % self.openmeet_meet['meet_id'],
+                                                      self.get_relay_results(state['relay_result_rows']), chunk_size)
+                    state['failed_chunks'] += self.record_upload('relay results', chunk_results)
+
+            await run_phases([
+                Phase('extract', extract),
+                Phase('prepare', prepare, ['extract']),
+                Phase('meet', meet, ['prepare']),
+                Phase('sync_teams', sync_teams, ['meet']),
+                Phase('existing_entries', existing_entries, ['meet']),
+                Phase('openmeet_teams', openmeet_teams, ['sync_teams']),
+                Phase('entries', entries, ['openmeet_teams', 'existing_entries']),
+                Phase('entry_updates', entry_updates, ['openmeet_teams', 'existing_entries']),
+                Phase('results', results, ['entries']),
+                Phase('relays', relays, ['openmeet_teams', 'meet']),
+                Phase('relay_results', relay_results, ['relays']),
+            ], self.profile)
+
+        self.count_profile_rows()
+
+        if state['changed']:
+            self.save_changes(state['meet_create'], state['digests'], state['failed_chunks'])
+
+        return state['failed_chunks']
+
+    def open_hytek_db(self):
+        return asyncio.run(self.open_hytek_db_async())
@@ -0,0 +1,111 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+import threading
+import time
+
+from meet_files import extract_mdb, file_extension, find_meet_files, private_temp_dir
+from openmeet_client import TeamsView
+from instrumentation import ImportProfile
+from table_reader import get_table_reader
+
+DEFAULT_BATCH_WORKERS = 4
+
+
+class BatchResult:
+
+    def __init__(self, meet_file, counts=None, elapsed=0.0, error=None, profile=None):
+        self.meet_file = meet_file
+        self.counts = counts if counts is not None else {}
+        self.elapsed = elapsed
+        self.error = error
+        self.profile = profile
+
+
+class BatchImporter:
+    # Imports many Meet Manager databases in one process, sharing the OpenMeet client
+    # and a single cached view of /teams between them
+
+    def __init__(self, importer_class, client, uploader, reader_backend=None, cache=None,
+                 max_workers=DEFAULT_BATCH_WORKERS):
+        self.importer_class = importer_class
+        self.client = client
+        self.uploader = uploader
+        self.reader_backend = reader_backend
+        self.cache = cache
+        self.max_workers = max_workers
+        self.teams_view = TeamsView(client)
+        self.meet_locks = {}
+        self.meet_locks_lock = threading.Lock()
+        # Timings and row counts of every meet in the batch
+        self.profile = ImportProfile()
+
+    def meet_lock(self, meet_name):
+        # Files of the same meet are imported one at a time, so the meet is only created once
+        with self.meet_locks_lock:
+            return self.meet_locks.setdefault(meet_name, threading.Lock())
+
+    def import_meet(self, meet_file):
+        start = time.perf_counter()
+        work_dir = private_temp_dir('hytek-batch-')
+
+        try:
+            data_file = meet_file
+            if file_extension(meet_file) == 'zip':
+                data_file = extract_mdb(meet_file, work_dir)
+                if data_file is None:
+                    return BatchResult(meet_file, error='No Meet Manager database found')
+
+            importer = self.importer_class(data_file, get_table_reader(data_file, self.reader_backend), self.cache,
+                                           self.client, self.uploader, self.teams_view)
+            meet_name = importer.read_table('meet')[0].Meet_name1
+
+            with self.meet_lock(meet_name):
+                importer.open_hytek_db()
+
+            return BatchResult(meet_file, importer.sent_counts, time.perf_counter() - start,
+                               profile=importer.profile)
+
+        # The importer exits on API errors, that should only fail this meet
+        except BaseException as e:
+            return BatchResult(meet_file, elapsed=time.perf_counter() - start, error=repr(e))
+
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def run(self, paths):
+        meet_files = find_meet_files(paths)
+        print('Importing %d meets with %d workers' % (len(meet_files), self.max_workers))
+
+        start = time.perf_counter()
+        results = []
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self.import_meet, x) for x in meet_files]
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+
+                if result.profile is not None:
+                    self.profile.merge(result.profile)
+
+                if result.error is not None:
+                    print('Failed %s: %s' % (result.meet_file, result.error))
+                else:
+                    print('Imported %s in %.1fs' % (result.meet_file, result.elapsed))
+
+        print_summary(results, time.perf_counter() - start)
+        return results
+
+
+def print_summary(results, elapsed):
+    imported = [x for x in results if x.error is None]
+    entries = sum(x.counts.get('entries', 0) for x in imported)
+    individual_results = sum(x.counts.get('results', 0) for x in imported)
+    relay_teams = sum(x.counts.get('relay teams', 0) for x in imported)
+    rate = 1 / elapsed if elapsed > 0 else 0
+
+    print('%d meets imported, %d failed in %.1fs' % (len(imported), len(results) - len(imported), elapsed))
+    print('%8.2f meets/s' % (len(imported) * rate))
+    print('%8.1f entries/s (%d)' % (entries * rate, entries))
+    print('%8.1f results/s (%d)' % (individual_results * rate, individual_results))
+    print('%8.1f relay teams/s (%d)' % (relay_teams * rate, relay_teams))
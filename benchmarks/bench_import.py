@@ -0,0 +1,115 @@
+# Time the import steps on synthetic meets against the fake OpenMeet server
+#
+#   python -m benchmarks.bench_import [--scales 1 10 100] [--no-memory]
+
+from contextlib import redirect_stdout
+import argparse
+import io
+import time
+import tracemalloc
+
+from benchmarks.synthetic_meet import generate_meet_tables, SyntheticReader
+from bulk_upload import BulkUploader
+from fake_openmeet import FakeOpenMeetServer
+from importer import HytekDbImporter
+from openmeet_client import OpenMeetClient
+
+
+def time_step(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start, None
+
+
+def trace_step(fn):
+    tracemalloc.start()
+    try:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_steps(tables, measure, importer_class=HytekDbImporter):
+    # Each step is measured once; the full flow runs first against an empty server and the
+    # individual steps then run on a fresh importer against the data it left behind
+    measurements = []
+
+    def step(name, fn, rows):
+        with redirect_stdout(io.StringIO()):
+            result, elapsed, peak = measure(fn)
+        measurements.append((name, rows, elapsed, peak))
+        return result
+
+    with FakeOpenMeetServer() as server:
+        client = OpenMeetClient(server.base_url)
+        uploader = BulkUploader(client)
+
+        importer = importer_class('synthetic.mdb', SyntheticReader(tables), client=client, uploader=uploader)
+        step('open_hytek_db', importer.open_hytek_db, len(tables['entry']))
+
+        importer = importer_class('synthetic.mdb', SyntheticReader(tables), client=client, uploader=uploader)
+        with redirect_stdout(io.StringIO()):
+            importer.load_snapshot()
+
+        meet_create = step('get_meet_setup', importer.get_meet_setup, len(tables['event']))
+
+        with redirect_stdout(io.StringIO()):
+            importer.openmeet_meet = importer.get_openmeet_meet(meet_create)
+            importer.openmeet_events = importer.openmeet_meet['events']
+
+        teams = importer.get_teams()
+        step('get_athletes', lambda: importer.get_athletes(teams), len(tables['athlete']))
+
+        with redirect_stdout(io.StringIO()):
+            importer.load_openmeet_teams()
+
+        # Existing entries are not loaded yet, so every entry is built
+        step('get_entries', lambda: list(importer.get_entries()), len(tables['entry']))
+
+        with redirect_stdout(io.StringIO()):
+            importer.get_existing_entries(importer.openmeet_meet['meet_id'])
+
+        step('get_individual_results', lambda: list(importer.get_individual_results()), len(tables['entry']))
+        step('get_relay_teams', importer.get_relay_teams, len(tables['relay']))
+        step('get_relay_results', lambda: list(importer.get_relay_results()), len(tables['relay']))
+
+        client.close()
+
+    return measurements
+
+
+def print_measurements(scale, measurements):
+    for name, rows, elapsed, peak in measurements:
+        line = '%4dx %-24s %8d rows %9.3fs %12.0f rows/s' % (scale, name, rows, elapsed,
+                                                           rows / elapsed if elapsed else 0)
+        if peak is not None:
+            line += ' %9.1f MiB peak' % (peak / 1048576)
+        print(line)
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark the import steps on synthetic Hy-Tek meets')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100],
+                        help='meet sizes as multiples of a 10 team, 200 athlete meet')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true',
+                        help='skip the tracemalloc pass that measures peak memory per step')
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        tables = generate_meet_tables(scale, args.seed)
+        print('%4dx %d teams, %d athletes, %d entries, %d relays' % (scale, len(tables['team']),
+                                                                      len(tables['athlete']), len(tables['entry']),
+                                                                      len(tables['relay'])))
+
+        print_measurements(scale, run_steps(tables, time_step))
+
+        # Tracing slows every allocation, so memory is measured in a separate pass. The fake server
+        # shares the process, so the open_hytek_db peak includes its copy of the uploaded data.
+        if not args.no_memory:
+            print_measurements(scale, run_steps(tables, trace_step))
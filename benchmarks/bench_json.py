@@ -0,0 +1,64 @@
+# Compare the JSON layer with plain stdlib json on a synthetic meet's entry table
+#
+#   python -m benchmarks.bench_json [--scale 100] [--repeat 5]
+
+import argparse
+import io
+import json
+import time
+
+from benchmarks.synthetic_meet import generate_meet_tables
+from json_codec import dumps, loads, JSON_BACKEND
+from table_reader import read_json_lines
+
+
+def best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def stdlib_read_lines(data):
+    # The row by row decoding the mdb-json reader used to do
+    return [json.loads(x) for x in io.TextIOWrapper(io.BytesIO(data), encoding='utf-8') if x.strip() != '']
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark JSON decoding and encoding of entry rows and payloads')
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    entry_rows = generate_meet_tables(args.scale)['entry']
+    row_lines = b'\n'.join(json.dumps(x).encode('utf-8') for x in entry_rows) + b'\n'
+
+    # Payloads shaped like the entries the importer posts, and the response listing them
+    entries = [{'athlete_id': x['Ath_no'], 'meet_id': 1, 'team_id': 1, 'program_number': x['Event_ptr'],
+                'seed_time': x['ConvSeed_time'], 'status_code': 'ENTERED', 'scratched': x['Scr_stat']}
+               for x in entry_rows]
+    response_body = json.dumps({'data': [dict(x, entry_id=i) for i, x in enumerate(entries)]}).encode('utf-8')
+
+    cases = [
+        ('decode row lines', len(entry_rows),
+         lambda: stdlib_read_lines(row_lines),
+         lambda: list(read_json_lines(io.BytesIO(row_lines)))),
+        ('encode entries payload', len(entries),
+         lambda: json.dumps(entries).encode('utf-8'),
+         lambda: dumps(entries)),
+        ('decode entries response', len(entries),
+         lambda: json.loads(response_body),
+         lambda: loads(response_body)),
+    ]
+
+    print('%d entry rows, %d bytes of row lines, JSON backend %s' % (len(entry_rows), len(row_lines), JSON_BACKEND))
+    for name, rows, baseline, fast in cases:
+        baseline_time = best_time(baseline, args.repeat)
+        fast_time = best_time(fast, args.repeat)
+        print('%-24s %9.4fs stdlib %9.4fs %-7s %6.1fx %12.0f rows/s' % (name, baseline_time, fast_time, JSON_BACKEND,
+                                                                      baseline_time / fast_time, rows / fast_time))
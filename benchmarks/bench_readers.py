@@ -0,0 +1,46 @@
+# Compare the table reader backends on a Meet Manager database
+#
+#   python -m benchmarks.bench_readers meet.mdb [--repeat 3]
+
+import argparse
+import time
+
+from table_reader import get_table_reader, NATIVE_BACKEND, MDB_JSON_BACKEND
+
+TABLES = ['meet', 'event', 'team', 'athlete', 'entry', 'relay', 'relaynames']
+
+
+def time_backend(db_file, backend, repeat):
+    best = None
+    rows = 0
+
+    for _ in range(repeat):
+        reader = get_table_reader(db_file, backend)
+        start = time.perf_counter()
+        rows = 0
+        for table_name in TABLES:
+            for _row in reader.read_table(table_name):
+                rows += 1
+        elapsed = time.perf_counter() - start
+
+        if best is None or elapsed < best:
+            best = elapsed
+
+    return rows, best
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmark Hy-Tek table reader backends')
+    parser.add_argument('db_file', help='Meet Manager .mdb file')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    for backend in [NATIVE_BACKEND, MDB_JSON_BACKEND]:
+        try:
+            rows, elapsed = time_backend(args.db_file, backend, args.repeat)
+        except (RuntimeError, OSError) as e:
+            print('%-10s unavailable: %s' % (backend, e))
+            continue
+
+        print('%-10s %8d rows %8.3fs %10.0f rows/s' % (backend, rows, elapsed, rows / elapsed if elapsed else 0))
@@ -0,0 +1,199 @@
+# Synthetic Hy-Tek Meet Manager tables for benchmarking, in the row format mdb-json produces.
+# Scale 1 is a club masters meet of 10 teams and 200 athletes; teams, athletes, entries and
+# relays grow linearly with the scale while the event program stays the same.
+
+import datetime
+import random
+
+from date_helper import HYTEK_DATE_FORMAT
+
+TEAMS_PER_SCALE = 10
+ATHLETES_PER_TEAM = 20
+ENTRIES_PER_ATHLETE = 3
+
+# (stroke, distances) for the individual events, swum as mixed timed finals
+INDIVIDUAL_PROGRAM = [
+    ('A', [50, 100, 200, 400]),
+    ('B', [50, 100, 200]),
+    ('C', [50, 100, 200]),
+    ('D', [50, 100, 200]),
+    ('E', [100, 200]),
+]
+
+# (stroke, distance, gender) for the relay events
+RELAY_PROGRAM = [
+    ('A', 200, 'M'),
+    ('A', 200, 'F'),
+    ('A', 200, 'X'),
+    ('E', 200, 'X'),
+]
+
+RELAY_LETTERS = 'AB'
+
+SPLIT_DISTANCE = 50
+
+
+def hytek_date(d):
+    return datetime.datetime(d.year, d.month, d.day).strftime(HYTEK_DATE_FORMAT)
+
+
+def swim_time(rng, distance):
+    return round(distance * rng.uniform(0.55, 0.9), 2)
+
+
+def split_rows(rng, distance, final_time, **owner):
+    # Cumulative splits every SPLIT_DISTANCE, the last one being the final time
+    count = max(1, distance // SPLIT_DISTANCE)
+    rows = []
+    for split_no in range(1, count + 1):
+        split_time = final_time if split_no == count else round(final_time * split_no / count * rng.uniform(0.95, 1.0), 2)
+        rows.append(dict(owner, Rnd_ltr='F', Split_no=split_no, Split_Time=split_time))
+    return rows
+
+
+def generate_meet_tables(scale=1, seed=0, meet_start=datetime.date(2024, 3, 2)):
+    rng = random.Random(seed)
+    tables = {}
+
+    tables['meet'] = [{
+        'Meet_name1': 'Synthetic Masters Meet x%d' % scale,
+        'Meet_start': hytek_date(meet_start),
+        'Meet_end': hytek_date(meet_start + datetime.timedelta(days=1)),
+        'entry_deadline': hytek_date(meet_start - datetime.timedelta(days=14)),
+        'indmax_perath': 5,
+        'relmax_perath': 2,
+        'entrymax_total': 7,
+        'Calc_date': hytek_date(datetime.date(meet_start.year, 12, 31)),
+        'Meet_class': 6,
+        'Meet_course': 2,
+    }]
+
+    events = []
+    for stroke, distances in INDIVIDUAL_PROGRAM:
+        for distance in distances:
+            events.append({'Ind_rel': 'I', 'Event_gender': 'X', 'Event_stroke': stroke, 'Event_dist': distance})
+    for stroke, distance, gender in RELAY_PROGRAM:
+        events.append({'Ind_rel': 'R', 'Event_gender': gender, 'Event_stroke': stroke, 'Event_dist': distance,
+                       'Num_RelayLegs': 4})
+
+    for event_no, event in enumerate(events, 1):
+        event.update({'Event_no': event_no, 'Event_ptr': event_no, 'Event_rounds': 1})
+    tables['event'] = events
+
+    individual_events = [x for x in events if x['Ind_rel'] == 'I']
+    relay_events = [x for x in events if x['Ind_rel'] == 'R']
+
+    tables['team'] = []
+    tables['athlete'] = []
+    tables['entry'] = []
+    tables['relay'] = []
+    tables['relaynames'] = []
+    tables['split'] = []
+
+    for team_no in range(1, TEAMS_PER_SCALE * scale + 1):
+        tables['team'].append({
+            'Team_no': team_no,
+            'Team_name': 'Synthetic Masters Club %d' % team_no,
+            'Team_abbr': 'S%04d' % team_no,
+        })
+
+        team_athletes = {'M': [], 'F': []}
+        for _ in range(ATHLETES_PER_TEAM):
+            ath_no = len(tables['athlete']) + 1
+            sex = rng.choice('MF')
+            birth_date = datetime.date(rng.randint(1940, 2004), rng.randint(1, 12), rng.randint(1, 28))
+
+            tables['athlete'].append({
+                'Ath_no': ath_no,
+                'Team_no': team_no,
+                'Comp_no': ath_no,
+                'Last_name': 'Surname%d' % ath_no,
+                'First_name': 'Given%d' % ath_no,
+                'Initial': rng.choice('ABCDEFGH '),
+                'Pref_name': '',
+                'Ath_Sex': sex,
+                'Birth_date': hytek_date(birth_date),
+                'Ath_age': meet_start.year - birth_date.year,
+                'Reg_no': 'SYN%06d' % ath_no,
+            })
+            team_athletes[sex].append(ath_no)
+
+            for event in rng.sample(individual_events, ENTRIES_PER_ATHLETE):
+                seed_time = swim_time(rng, event['Event_dist'])
+                final_time = swim_time(rng, event['Event_dist'])
+                entry = {
+                    'Event_ptr': event['Event_ptr'],
+                    'Ath_no': ath_no,
+                    'ConvSeed_time': seed_time,
+                    'ActualSeed_time': seed_time,
+                    'Scr_stat': rng.random() < 0.05,
+                }
+
+                # Most swims have a touch pad time and one backup watch
+                if not entry['Scr_stat']:
+                    entry['Fin_Time'] = final_time
+                    entry['Fin_pad'] = final_time
+                    entry['Fin_back1'] = round(final_time + rng.uniform(-0.2, 0.2), 2)
+                    tables['split'].extend(split_rows(rng, event['Event_dist'], final_time,
+                                                      Event_ptr=event['Event_ptr'], Ath_no=ath_no, Relay_no=0))
+
+                tables['entry'].append(entry)
+
+        for event in relay_events:
+            if event['Event_gender'] == 'X':
+                half = event['Num_RelayLegs'] // 2
+                pool = None
+                if len(team_athletes['M']) >= half * len(RELAY_LETTERS) and len(team_athletes['F']) >= half * len(RELAY_LETTERS):
+                    males = rng.sample(team_athletes['M'], half * len(RELAY_LETTERS))
+                    females = rng.sample(team_athletes['F'], half * len(RELAY_LETTERS))
+                    pool = [x for pair in zip(males, females) for x in pair]
+            else:
+                athletes = team_athletes[event['Event_gender']]
+                pool = rng.sample(athletes, event['Num_RelayLegs'] * len(RELAY_LETTERS)) \
+                    if len(athletes) >= event['Num_RelayLegs'] * len(RELAY_LETTERS) else None
+
+            if pool is None:
+                continue
+
+            for index, letter in enumerate(RELAY_LETTERS):
+                relay_no = len(tables['relay']) + 1
+                final_time = swim_time(rng, event['Event_dist'])
+                tables['relay'].append({
+                    'Relay_no': relay_no,
+                    'Team_no': team_no,
+                    'Event_ptr': event['Event_ptr'],
+                    'ConvSeed_time': swim_time(rng, event['Event_dist']),
+                    'Team_ltr': letter,
+                    'Scr_stat': False,
+                    'Fin_Time': final_time,
+                    'Fin_pad': final_time,
+                })
+                tables['split'].extend(split_rows(rng, event['Event_dist'], final_time,
+                                                  Event_ptr=event['Event_ptr'], Ath_no=0, Relay_no=relay_no))
+
+                legs = pool[index * event['Num_RelayLegs']:(index + 1) * event['Num_RelayLegs']]
+                for pos_no, ath_no in enumerate(legs, 1):
+                    tables['relaynames'].append({
+                        'Relay_no': relay_no,
+                        'Ath_no': ath_no,
+                        'Pos_no': pos_no,
+                        'Event_ptr': event['Event_ptr'],
+                    })
+
+    # Meet Manager keeps rows in insertion order, not grouped by relay
+    rng.shuffle(tables['relaynames'])
+
+    return tables
+
+
+class SyntheticReader:
+    # Table reader serving generated rows, used in place of a Meet Manager database
+
+    name = 'synthetic'
+    concurrent = True
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def read_table(self, table_name):
+        return iter(self.tables.get(table_name, []))
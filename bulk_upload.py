@@ -0,0 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from itertools import islice
+
+from json_codec import response_json
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_UPLOAD_WORKERS = 4
+
+
+def chunked(items, chunk_size):
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+class ChunkResult:
+    # Outcome of sending one chunk of a bulk upload
+
+    def __init__(self, index, items, response=None, error=None):
+        self.index = index
+        self.items = items
+        self.response = response
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None and self.response.status_code == 200
+
+    def data(self):
+        return response_json(self.response)['data']
+
+    def describe_error(self):
+        if self.error is not None:
+            return str(self.error)
+        return '%d %s' % (self.response.status_code, self.response.text)
+
+
+class BulkUploader:
+    # Splits large payloads into chunks and sends them with bounded parallelism
+
+    def __init__(self, client, chunk_size=DEFAULT_CHUNK_SIZE, max_workers=DEFAULT_UPLOAD_WORKERS):
+        self.client = client
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers
+
+    def send_chunk(self, method, path, index, items):
+        try:
+            response = self.client.request(method, path, payload=items)
+        except Exception as e:
+            return ChunkResult(index, items, error=e)
+        return ChunkResult(index, items, response=response)
+
+    def upload(self, method, path, items):
+        results = []
+        pending = set()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for index, chunk in enumerate(chunked(items, self.chunk_size)):
+                # Only keep a couple of chunks queued per worker
+                if len(pending) >= self.max_workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(x.result() for x in done)
+
+                pending.add(executor.submit(self.send_chunk, method, path, index, chunk))
+
+            results.extend(x.result() for x in pending)
+
+        return sorted(results, key=lambda x: x.index)
+
+    def post(self, path, items):
+        return self.upload('POST', path, items)
+
+    def put(self, path, items):
+        return self.upload('PUT', path, items)
+
+    def patch(self, path, items):
+        return self.upload('PATCH', path, items)
+
+
+def report_failed_chunks(description, chunk_results):
+    failed = [x for x in chunk_results if not x.ok]
+
+    for chunk_result in failed:
+        print('Error uploading %s chunk %d (%d rows)' % (description, chunk_result.index, len(chunk_result.items)))
+        print(chunk_result.describe_error())
+
+    return len(failed)
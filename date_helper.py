@@ -1,22 +1,65 @@
 import datetime
+from functools import lru_cache
 from dateutil.relativedelta import *
 
 HYTEK_DATE_FORMAT = '%m/%d/%y %H:%M:%S'
 
+# Birth dates repeat heavily across a roster, so conversions are memoized on the raw string
+DATE_CACHE_SIZE = 8192
 
+_reference_date = None
+
+
+def get_reference_date():
+    # Date ages are calculated against, fixed for the whole run
+    global _reference_date
+    if _reference_date is None:
+        _reference_date = datetime.date.today()
+    return _reference_date
+
+
+def set_reference_date(reference_date):
+    global _reference_date
+    _reference_date = reference_date
+    _hytek_dob.cache_clear()
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def parse_hytek_date(hytek_date):
     return datetime.datetime.strptime(hytek_date, HYTEK_DATE_FORMAT)
 
 
-def get_hytek_dob(hytek_date, age):
+@lru_cache(maxsize=DATE_CACHE_SIZE)
+def _hytek_dob(hytek_date, reference_date):
     hytek_dob = parse_hytek_date(hytek_date)
-    calc_age = relativedelta(datetime.date.today(), hytek_dob).years
+    calc_age = relativedelta(reference_date, hytek_dob).years
 
+    # Two digit years in the future are birth dates from the previous century
     if calc_age < 0:
         hytek_dob = hytek_dob - relativedelta(years=100)
 
     return hytek_dob
 
 
+def get_hytek_dob(hytek_date, reference_date=None):
+    if reference_date is None:
+        reference_date = get_reference_date()
+    return _hytek_dob(hytek_date, reference_date)
+
+
+def parse_hytek_dates(hytek_dates):
+    converted = {x: parse_hytek_date(x) for x in set(hytek_dates)}
+    return [converted[x] for x in hytek_dates]
+
+
+def get_hytek_dobs(hytek_dates, reference_date=None):
+    if reference_date is None:
+        reference_date = get_reference_date()
+
+    converted = {x: _hytek_dob(x, reference_date) for x in set(hytek_dates)}
+    return [converted[x] for x in hytek_dates]
+
+
+@lru_cache(maxsize=DATE_CACHE_SIZE)
 def to_sql_date(dt):
     return dt.strftime('%Y-%m-%d')
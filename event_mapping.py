@@ -0,0 +1,138 @@
+# Table driven mapping of Hy-Tek events to OpenMeet event types, disciplines and distances.
+# Every rule is expanded into tuple keys up front, so resolving an event row is a dict lookup
+# per attribute. Extra rules can be loaded from a JSON file:
+#
+#   {
+#     "event_types": [{"meet_class": 1, "rounds": 1, "ind_rel": "I", "gender": "F",
+#                      "event_type": "Seeded Womens Individual Finals"}],
+#     "disciplines": [{"ind_rel": "R", "stroke": "A", "discipline": "Freestyle"}],
+#     "courses": [{"meet_course": 3, "course": "SCY", "unit": "y"}]
+#   }
+#
+# Fields left out of an event type or discipline rule match every value. Later rules win.
+
+import json
+
+MEET_CLASS_MASTERS = 6
+
+EVENT_ROUNDS = (1, 2, 3)
+EVENT_KINDS = ('I', 'R')
+EVENT_GENDERS = ('M', 'F', 'X')
+EVENT_STROKES = ('A', 'B', 'C', 'D', 'E')
+
+ROUND_NAMES = {
+    1: 'Finals',
+    2: 'Prelims and Finals',
+    3: 'Prelims, Semis and Finals',
+}
+
+RELAY_GENDER_NAMES = {
+    'M': 'Mens',
+    'F': 'Womens',
+    'X': 'Mixed',
+}
+
+INDIVIDUAL_DISCIPLINES = {
+    'A': 'Freestyle',
+    'B': 'Backstroke',
+    'C': 'Breaststroke',
+    'D': 'Butterfly',
+    'E': 'Individual Medley',
+}
+
+RELAY_DISCIPLINES = {
+    'A': 'Freestyle',
+    'E': 'Medley',
+}
+
+COURSES = {
+    1: ('LC', 'm'),
+    2: ('SC', 'm'),
+}
+
+
+def expand(value, choices):
+    return choices if value is None else (value,)
+
+
+def program_number(event_row):
+    # Lettered events share an event number, e.g. 12A and 12B
+    if event_row.Event_ltr:
+        return '%s%s' % (event_row.Event_no, event_row.Event_ltr)
+    return event_row.Event_no
+
+
+class EventMapping:
+
+    def __init__(self):
+        self.event_types = {}   # (meet_class, rounds, ind_rel, gender) -> event_type
+        self.disciplines = {}   # (ind_rel, stroke) -> discipline
+        self.courses = {}       # meet_course -> (course, unit)
+
+    def add_event_type(self, event_type, meet_class, rounds=None, ind_rel=None, gender=None):
+        for key_rounds in expand(rounds, EVENT_ROUNDS):
+            for key_ind_rel in expand(ind_rel, EVENT_KINDS):
+                for key_gender in expand(gender, EVENT_GENDERS):
+                    self.event_types[(meet_class, key_rounds, key_ind_rel, key_gender)] = event_type
+
+    def add_discipline(self, discipline, stroke, ind_rel=None):
+        for key_ind_rel in expand(ind_rel, EVENT_KINDS):
+            self.disciplines[(key_ind_rel, stroke)] = discipline
+
+    def add_course(self, meet_course, course, unit='m'):
+        self.courses[meet_course] = (course, unit)
+
+    def load(self, config_file):
+        with open(config_file) as f:
+            config = json.load(f)
+
+        for rule in config.get('event_types', []):
+            self.add_event_type(rule['event_type'], rule['meet_class'], rule.get('rounds'), rule.get('ind_rel'),
+                                rule.get('gender'))
+
+        for rule in config.get('disciplines', []):
+            self.add_discipline(rule['discipline'], rule['stroke'], rule.get('ind_rel'))
+
+        for rule in config.get('courses', []):
+            self.add_course(rule['meet_course'], rule['course'], rule.get('unit', 'm'))
+
+    def event_type(self, meet_class, event_row):
+        return self.event_types.get((meet_class, event_row.Event_rounds, event_row.Ind_rel, event_row.Event_gender), '')
+
+    def discipline(self, event_row):
+        return self.disciplines.get((event_row.Ind_rel, event_row.Event_stroke), '')
+
+    def distance(self, meet_course, event_row):
+        course, unit = self.courses.get(meet_course, ('', 'm'))
+        return str(event_row.Event_dist) + unit + ' ' + course
+
+    def legs(self, event_row):
+        if event_row.Ind_rel == 'R' and event_row.Num_RelayLegs:
+            return event_row.Num_RelayLegs
+        return 1
+
+
+def default_event_mapping():
+    mapping = EventMapping()
+
+    # Masters individual events are swum and seeded mixed, whatever the event gender
+    for rounds, round_name in ROUND_NAMES.items():
+        mapping.add_event_type('Seeded Individual Mixed %s' % round_name, MEET_CLASS_MASTERS, rounds, 'I')
+
+        for gender, gender_name in RELAY_GENDER_NAMES.items():
+            mapping.add_event_type('Seeded %s Relay %s' % (gender_name, round_name), MEET_CLASS_MASTERS, rounds,
+                                   'R', gender)
+
+    for stroke, discipline in INDIVIDUAL_DISCIPLINES.items():
+        mapping.add_discipline(discipline, stroke, 'I')
+
+    for stroke, discipline in RELAY_DISCIPLINES.items():
+        mapping.add_discipline(discipline, stroke, 'R')
+
+    for meet_course, (course, unit) in COURSES.items():
+        mapping.add_course(meet_course, course, unit)
+
+    return mapping
+
+
+DEFAULT_EVENT_MAPPING = default_event_mapping()
@@ -0,0 +1,254 @@
+# In-memory stand-in for the OpenMeet API, covering the endpoints the importer uses.
+#
+#   python fake_openmeet.py --port 8000
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import gzip
+import json
+import re
+import threading
+
+
+class FakeOpenMeetState:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.meets = {}
+        self.teams = []
+        self.entries = {}
+        self.results = {}
+        self.relays = {}
+        self.relay_results = {}
+        self.next_id = 1
+        self.requests = []
+
+    def new_id(self):
+        new_id = self.next_id
+        self.next_id += 1
+        return new_id
+
+    def find_meet(self, meetname):
+        return next((x for x in self.meets.values() if x['meetname'] == meetname), None)
+
+    def create_meet(self, meet):
+        meet = dict(meet, meet_id=self.new_id())
+        meet['events'] = [dict(x, event_id=self.new_id()) for x in meet.get('events', [])]
+        self.meets[meet['meet_id']] = meet
+        self.entries[meet['meet_id']] = []
+        self.results[meet['meet_id']] = {}
+        self.relays[meet['meet_id']] = []
+        self.relay_results[meet['meet_id']] = {}
+        return meet
+
+    def add_member(self, team, member):
+        member = dict(member, athlete_id=self.new_id(), team_id=team['team_id'])
+        team['members'].append(member)
+        return member
+
+    def add_teams(self, teams):
+        added = []
+        for team in teams:
+            new_team = {'team_id': self.new_id(), 'team_name': team['team_name'],
+                        'abbreviation': team['abbreviation'], 'members': []}
+            self.teams.append(new_team)
+            for member in team.get('members', []):
+                self.add_member(new_team, member)
+            added.append(new_team)
+        return added
+
+    def add_athletes(self, athletes):
+        # Athletes whose team_id matches no team are accepted but not attached to a team
+        added = []
+        for athlete in athletes:
+            team = next((x for x in self.teams if x['team_id'] == athlete.get('team_id')), None)
+            if team is not None:
+                added.append(self.add_member(team, athlete))
+        return added
+
+    def lookup_teams(self, query):
+        # Teams named in the query, plus any team holding a requested member, with
+        # members cut down to the requested member numbers
+        abbreviations = set(query.get('abbreviations', []))
+        team_names = set(query.get('team_names', []))
+        member_numbers = set(query.get('member_numbers', []))
+
+        teams = []
+        for team in self.teams:
+            members = [x for x in team['members'] if x['member_number'] in member_numbers]
+            if team['abbreviation'] in abbreviations or team['team_name'] in team_names or len(members) > 0:
+                teams.append(dict(team, members=members))
+        return teams
+
+    def add_entries(self, meet_id, entries):
+        added = []
+        for entry in entries:
+            entry = dict(entry, entry_id=self.new_id(), program_number=str(entry['program_number']))
+            self.entries[meet_id].append(entry)
+            added.append(entry)
+        return added
+
+    def add_relays(self, meet_id, relays):
+        added = []
+        for relay in relays:
+            relay = dict(relay, relay_id=self.new_id(), program_number=str(relay['program_number']))
+            self.relays[meet_id].append(relay)
+            added.append(relay)
+        return added
+
+    def update_relays(self, meet_id, updates):
+        relays = {x['relay_id']: x for x in self.relays[meet_id]}
+        updated = []
+        for update in updates:
+            relay = relays.get(update['relay_id'])
+            if relay is not None:
+                relay.update(update)
+                updated.append(relay)
+        return updated
+
+    def update_entries(self, meet_id, updates):
+        entries = {x['entry_id']: x for x in self.entries[meet_id]}
+        updated = []
+        for update in updates:
+            entry = entries.get(update['entry_id'])
+            if entry is not None:
+                entry.update(update)
+                updated.append(entry)
+        return updated
+
+
+class FakeOpenMeetHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def read_payload(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length) if length > 0 else b''
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        self.state.requests.append((self.command, self.path, len(body)))
+        return json.loads(body) if len(body) > 0 else None
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_request(self):
+        url = urlparse(self.path)
+        payload = self.read_payload()
+        meet_match = re.match(r'^/meet/(\d+)/(entries|results|relays|relays/results)$', url.path)
+
+        with self.state.lock:
+            if url.path == '/meet' and self.command == 'GET':
+                meet = self.state.find_meet(parse_qs(url.query).get('meetname', [''])[0])
+                if meet is None:
+                    return self.send_json(404, {'error': 'Meet not found'})
+                return self.send_json(200, {'data': meet})
+
+            if url.path == '/meet' and self.command == 'POST':
+                return self.send_json(200, {'data': self.state.create_meet(payload)})
+
+            if url.path == '/teams' and self.command == 'GET':
+                return self.send_json(200, {'data': self.state.teams})
+
+            if url.path == '/teams' and self.command == 'POST':
+                return self.send_json(200, {'data': self.state.add_teams(payload)})
+
+            if url.path == '/teams/lookup' and self.command == 'POST':
+                return self.send_json(200, {'data': self.state.lookup_teams(payload)})
+
+            if url.path == '/athletes' and self.command == 'POST':
+                return self.send_json(200, {'data': self.state.add_athletes(payload)})
+
+            if meet_match is not None:
+                meet_id = int(meet_match.group(1))
+                if meet_id not in self.state.meets:
+                    return self.send_json(404, {'error': 'Meet not found'})
+
+                collection = meet_match.group(2)
+                if collection == 'entries' and self.command == 'GET':
+                    return self.send_json(200, {'data': self.state.entries[meet_id]})
+                if collection == 'entries' and self.command == 'POST':
+                    return self.send_json(200, {'data': self.state.add_entries(meet_id, payload)})
+                if collection == 'entries' and self.command == 'PATCH':
+                    return self.send_json(200, {'data': self.state.update_entries(meet_id, payload)})
+                if collection == 'results' and self.command == 'PUT':
+                    for result in payload:
+                        self.state.results[meet_id][result['entry_id']] = result
+                    return self.send_json(200, {'data': payload})
+                if collection == 'relays/results' and self.command == 'PUT':
+                    for result in payload:
+                        key = (str(result['program_number']), result['team_id'], result['letter'])
+                        self.state.relay_results[meet_id][key] = result
+                    return self.send_json(200, {'data': payload})
+                if collection == 'relays' and self.command == 'GET':
+                    return self.send_json(200, {'data': self.state.relays[meet_id]})
+                if collection == 'relays' and self.command == 'POST':
+                    return self.send_json(200, {'data': self.state.add_relays(meet_id, payload)})
+                if collection == 'relays' and self.command == 'PATCH':
+                    return self.send_json(200, {'data': self.state.update_relays(meet_id, payload)})
+
+        return self.send_json(404, {'error': 'Not found'})
+
+    do_GET = handle_request
+    do_POST = handle_request
+    do_PUT = handle_request
+    do_PATCH = handle_request
+
+
+class FakeOpenMeetServer:
+    # Runs the stand-in API on a background thread, port 0 picks a free port
+
+    def __init__(self, host='127.0.0.1', port=0):
+        self.state = FakeOpenMeetState()
+        self.httpd = ThreadingHTTPServer((host, port), FakeOpenMeetHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = self.state
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Run an in-memory stand-in for the OpenMeet API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    server = FakeOpenMeetServer(args.host, args.port)
+    print('Fake OpenMeet listening on %s' % server.base_url)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
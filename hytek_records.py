@@ -0,0 +1,96 @@
+class HytekRecord:
+    # A Hy-Tek table row holding only the columns the importer uses. Missing (null)
+    # columns are None and the columns in stripped have trailing whitespace removed.
+
+    __slots__ = ()
+    stripped = ()
+
+    @classmethod
+    def from_row(cls, row):
+        record = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = row.get(name)
+            if value is not None and name in cls.stripped:
+                value = value.rstrip()
+            setattr(record, name, value)
+        return record
+
+    def values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.values() == other.values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join('%s=%r' % x for x in zip(self.__slots__, self.values())))
+
+
+class MeetRecord(HytekRecord):
+    __slots__ = ('Meet_name1', 'Meet_start', 'Meet_end', 'entry_deadline', 'indmax_perath', 'relmax_perath',
+                 'entrymax_total', 'Calc_date', 'Meet_class', 'Meet_course')
+
+
+class EventRecord(HytekRecord):
+    __slots__ = ('Event_no', 'Event_ltr', 'Event_ptr', 'Event_rounds', 'Ind_rel', 'Event_gender', 'Num_RelayLegs',
+                 'Event_stroke', 'Event_dist')
+    stripped = ('Event_ltr',)
+
+
+class TeamRecord(HytekRecord):
+    __slots__ = ('Team_no', 'Team_name', 'Team_abbr')
+    stripped = ('Team_name', 'Team_abbr')
+
+
+class AthleteRecord(HytekRecord):
+    __slots__ = ('Ath_no', 'Team_no', 'Comp_no', 'Last_name', 'First_name', 'Initial', 'Pref_name', 'Ath_Sex',
+                 'Birth_date', 'Ath_age', 'Reg_no')
+    stripped = ('Last_name', 'First_name', 'Initial', 'Pref_name', 'Ath_Sex', 'Reg_no')
+
+
+class EntryRecord(HytekRecord):
+    __slots__ = ('Event_ptr', 'Ath_no', 'ConvSeed_time', 'ActualSeed_time', 'Scr_stat',
+                 'Fin_Time', 'Fin_pad', 'Fin_back1', 'Fin_back2', 'Fin_back3')
+
+
+class ResultRecord(HytekRecord):
+    # Just the key and result columns of an entry row, for results only refreshes
+    __slots__ = ('Event_ptr', 'Ath_no', 'Fin_Time', 'Fin_pad', 'Fin_back1', 'Fin_back2', 'Fin_back3')
+
+
+class RelayRecord(HytekRecord):
+    __slots__ = ('Relay_no', 'Team_no', 'Event_ptr', 'ConvSeed_time', 'Team_ltr', 'Scr_stat',
+                 'Fin_Time', 'Fin_pad', 'Fin_back1', 'Fin_back2', 'Fin_back3')
+
+
+class RelayNameRecord(HytekRecord):
+    __slots__ = ('Relay_no', 'Ath_no', 'Pos_no')
+
+
+class SplitRecord(HytekRecord):
+    # Cumulative split of an individual swim (Event_ptr, Ath_no) or of a relay (Relay_no)
+    __slots__ = ('Event_ptr', 'Ath_no', 'Relay_no', 'Rnd_ltr', 'Split_no', 'Split_Time')
+    stripped = ('Rnd_ltr',)
+
+
+TABLE_RECORDS = {
+    'meet': MeetRecord,
+    'event': EventRecord,
+    'team': TeamRecord,
+    'athlete': AthleteRecord,
+    'entry': EntryRecord,
+    'relay': RelayRecord,
+    'relaynames': RelayNameRecord,
+    'split': SplitRecord,
+}
+
+
+def to_records(table_name, rows):
+    record_type = TABLE_RECORDS.get(table_name)
+    if record_type is None:
+        return list(rows)
+    return [record_type.from_row(row) for row in rows]
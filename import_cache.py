@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from watch import RESULT_FIELDS, result_key, split_key
+
+DEFAULT_CACHE_FILE = os.path.join(os.path.expanduser('~'), '.openmeet-hytek-cache.sqlite')
+DEFAULT_MAX_MEETS = 20
+
+
+def project_fields(row, fields):
+    return [getattr(row, field) for field in fields]
+
+
+def exclude_fields(row, fields):
+    return [getattr(row, field) for field in row.__slots__ if field not in fields]
+
+
+def all_fields(row):
+    return list(row.values())
+
+
+# section -> (table, row key, projection of the row that is hashed)
+CACHE_SECTIONS = {
+    'meet': ('meet', lambda x: 0, all_fields),
+    'event': ('event', lambda x: x.Event_ptr, all_fields),
+    'team': ('team', lambda x: x.Team_no, all_fields),
+    'athlete': ('athlete', lambda x: x.Ath_no, all_fields),
+    'entry': ('entry', result_key, lambda x: exclude_fields(x, RESULT_FIELDS)),
+    'result': ('entry', result_key, lambda x: project_fields(x, RESULT_FIELDS)),
+    'relay': ('relay', lambda x: x.Relay_no, lambda x: exclude_fields(x, RESULT_FIELDS)),
+    'relay_result': ('relay', lambda x: x.Relay_no, lambda x: project_fields(x, RESULT_FIELDS)),
+    'relaynames': ('relaynames', lambda x: (x.Relay_no, x.Pos_no), all_fields),
+    'split': ('split', split_key, all_fields),
+}
+
+
+def encode_key(key):
+    return json.dumps(key, default=str)
+
+
+def row_digest(row):
+    return hashlib.sha1(json.dumps(row, default=str).encode('utf-8')).hexdigest()
+
+
+def section_row_key(section, row):
+    return encode_key(CACHE_SECTIONS[section][1](row))
+
+
+def section_digests(section, rows):
+    table_name, key, projection = CACHE_SECTIONS[section]
+    return {encode_key(key(row)): row_digest(projection(row)) for row in rows}
+
+
+def snapshot_digests(snapshot):
+    digests = {}
+
+    for section, (table_name, key, projection) in CACHE_SECTIONS.items():
+        digests[section] = section_digests(section, snapshot.table(table_name))
+
+    return digests
+
+
+class ImportChanges:
+    # Difference between the rows of this run and those of the last successful import
+
+    def __init__(self, previous, current):
+        self.previous = previous
+        self.current = current
+        self.changed = {}
+
+        for section, rows in current.items():
+            previous_rows = previous.get(section, {}) if previous is not None else {}
+            self.changed[section] = set(key for key, digest in rows.items() if previous_rows.get(key) != digest)
+
+    def is_first_import(self):
+        return self.previous is None
+
+    def section_changed(self, *sections):
+        return any(len(self.changed[section]) > 0 for section in sections)
+
+    def any_changed(self):
+        return self.section_changed(*self.changed.keys())
+
+    def row_changed(self, section, row):
+        return section_row_key(section, row) in self.changed[section]
+
+    def changed_rows(self, section, rows):
+        return [row for row in rows if self.row_changed(section, row)]
+
+
+class ImportCache:
+    # Row fingerprints of the last successful import of each meet, and the OpenMeet entry IDs
+    # of its entries, stored in SQLite
+
+    def __init__(self, cache_file=DEFAULT_CACHE_FILE, max_meets=DEFAULT_MAX_MEETS):
+        self.cache_file = cache_file
+        self.max_meets = max_meets
+        # Batch imports share one cache between worker threads
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(cache_file, check_same_thread=False)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS meets (
+                meet_name TEXT PRIMARY KEY,
+                imported_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS row_digests (
+                meet_name TEXT NOT NULL,
+                section TEXT NOT NULL,
+                row_key TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (meet_name, section, row_key)
+            );
+            CREATE TABLE IF NOT EXISTS openmeet_meets (
+                meet_name TEXT PRIMARY KEY,
+                meet_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS entry_ids (
+                meet_name TEXT NOT NULL,
+                event_ptr INTEGER NOT NULL,
+                ath_no INTEGER NOT NULL,
+                entry_id INTEGER NOT NULL,
+                PRIMARY KEY (meet_name, event_ptr, ath_no)
+            );
+        ''')
+
+    def load(self, meet_name):
+        with self.lock:
+            return self.load_digests(meet_name)
+
+    def load_digests(self, meet_name):
+        meet = self.connection.execute('SELECT 1 FROM meets WHERE meet_name = ?', (meet_name,)).fetchone()
+        if meet is None:
+            return None
+
+        digests = {section: {} for section in CACHE_SECTIONS}
+        rows = self.connection.execute('SELECT section, row_key, digest FROM row_digests WHERE meet_name = ?',
+                                       (meet_name,))
+        for section, row_key, digest in rows:
+            digests.setdefault(section, {})[row_key] = digest
+
+        return digests
+
+    def load_section(self, meet_name, section):
+        with self.lock:
+            rows = self.connection.execute('SELECT row_key, digest FROM row_digests WHERE meet_name = ? AND section = ?',
+                                           (meet_name, section))
+            return dict(rows)
+
+    def save_section(self, meet_name, section, digests):
+        # Replace one section of an import that is already cached
+        with self.lock, self.connection:
+            self.connection.execute('DELETE FROM row_digests WHERE meet_name = ? AND section = ?',
+                                    (meet_name, section))
+            self.connection.executemany('INSERT INTO row_digests VALUES (?, ?, ?, ?)',
+                                        ((meet_name, section, row_key, digest) for row_key, digest in digests.items()))
+            self.connection.execute('UPDATE meets SET imported_at = ? WHERE meet_name = ?', (time.time(), meet_name))
+
+    def load_entry_ids(self, meet_name):
+        # Returns the OpenMeet meet_id and a (Event_ptr, Ath_no) -> entry_id mapping, or None
+        with self.lock:
+            meet = self.connection.execute('SELECT meet_id FROM openmeet_meets WHERE meet_name = ?',
+                                           (meet_name,)).fetchone()
+            if meet is None:
+                return None
+
+            rows = self.connection.execute('SELECT event_ptr, ath_no, entry_id FROM entry_ids WHERE meet_name = ?',
+                                           (meet_name,))
+            return meet[0], {(event_ptr, ath_no): entry_id for event_ptr, ath_no, entry_id in rows}
+
+    def save_entry_ids(self, meet_name, meet_id, entry_ids):
+        with self.lock, self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO openmeet_meets VALUES (?, ?)', (meet_name, meet_id))
+            self.connection.execute('DELETE FROM entry_ids WHERE meet_name = ?', (meet_name,))
+            self.connection.executemany('INSERT INTO entry_ids VALUES (?, ?, ?, ?)',
+                                        ((meet_name, event_ptr, ath_no, entry_id)
+                                         for (event_ptr, ath_no), entry_id in entry_ids.items()))
+
+    def load_meet_id(self, meet_name):
+        # The OpenMeet meet_id the meet was last imported into, or None
+        with self.lock:
+            meet = self.connection.execute('SELECT meet_id FROM openmeet_meets WHERE meet_name = ?',
+                                           (meet_name,)).fetchone()
+            return meet[0] if meet is not None else None
+
+    def save_meet_id(self, meet_name, meet_id):
+        with self.lock, self.connection:
+            meet = self.connection.execute('SELECT meet_id FROM openmeet_meets WHERE meet_name = ?',
+                                           (meet_name,)).fetchone()
+            # Entry IDs of another OpenMeet meet are no use
+            if meet is not None and meet[0] != meet_id:
+                self.connection.execute('DELETE FROM entry_ids WHERE meet_name = ?', (meet_name,))
+            self.connection.execute('INSERT OR REPLACE INTO openmeet_meets VALUES (?, ?)', (meet_name, meet_id))
+
+    def save(self, meet_name, digests):
+        with self.lock:
+            self.save_digests(meet_name, digests)
+            self.evict()
+
+    def save_digests(self, meet_name, digests):
+        with self.connection:
+            self.connection.execute('DELETE FROM row_digests WHERE meet_name = ?', (meet_name,))
+            self.connection.executemany('INSERT INTO row_digests VALUES (?, ?, ?, ?)',
+                                        ((meet_name, section, row_key, digest)
+                                         for section, rows in digests.items()
+                                         for row_key, digest in rows.items()))
+            self.connection.execute('INSERT OR REPLACE INTO meets VALUES (?, ?)', (meet_name, time.time()))
+
+    def evict(self):
+        old_meets = self.connection.execute('SELECT meet_name FROM meets ORDER BY imported_at DESC LIMIT -1 OFFSET ?',
+                                            (self.max_meets,)).fetchall()
+        with self.connection:
+            for (meet_name,) in old_meets:
+                self.connection.execute('DELETE FROM row_digests WHERE meet_name = ?', (meet_name,))
+                self.connection.execute('DELETE FROM entry_ids WHERE meet_name = ?', (meet_name,))
+                self.connection.execute('DELETE FROM openmeet_meets WHERE meet_name = ?', (meet_name,))
+                self.connection.execute('DELETE FROM meets WHERE meet_name = ?', (meet_name,))
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,122 @@
+# An import computed ahead of time. Payloads are built with references standing in for the
+# OpenMeet IDs of the meet, teams, athletes and entries that don't exist yet; they are
+# resolved while the plan is applied, once those objects have been created.
+
+import datetime
+import gzip
+import json
+
+from json_codec import dumps, loads
+
+PLAN_VERSION = 1
+
+# Steps in the order they are applied
+PLAN_STEPS = ['teams', 'athletes', 'entries', 'entry updates', 'results', 'relay teams', 'relay updates',
+              'relay results']
+
+# Payload fields that can hold a reference
+REF_FIELDS = ('meet_id', 'team_id', 'athlete_id', 'entry_id')
+
+
+def make_ref(*key):
+    return '$' + json.dumps(list(key), separators=(',', ':'))
+
+
+def is_ref(value):
+    return isinstance(value, str) and value.startswith('$[')
+
+
+def parse_ref(ref):
+    return json.loads(ref[1:])
+
+
+def meet_ref():
+    return make_ref('meet')
+
+
+def team_ref(abbreviation):
+    return make_ref('team', abbreviation)
+
+
+def athlete_ref(abbreviation, member_number):
+    return make_ref('athlete', abbreviation, member_number)
+
+
+def entry_ref(program_number, athlete_id):
+    return make_ref('entry', str(program_number), athlete_id)
+
+
+def resolve_refs(value, resolve):
+    # Copy of a payload with every reference replaced by resolve(ref), which raises KeyError
+    # for objects that were never created
+    if isinstance(value, list):
+        return [resolve_refs(x, resolve) for x in value]
+
+    if isinstance(value, dict):
+        resolved = {}
+        for key, item in value.items():
+            if key in REF_FIELDS and is_ref(item):
+                resolved[key] = resolve(item)
+            else:
+                resolved[key] = resolve_refs(item, resolve)
+        return resolved
+
+    return value
+
+
+class ImportPlan:
+
+    def __init__(self, meet_create, digests=None, steps=None, created_at=None, teams_query=None):
+        self.meet_create = meet_create
+        self.digests = digests
+        self.steps = steps if steps is not None else {}
+        # The /teams/lookup query of the meet's teams and athletes, so applying the plan doesn't
+        # need the Hy-Tek database
+        self.teams_query = teams_query
+        self.created_at = created_at if created_at is not None else datetime.datetime.now().isoformat()
+
+    @property
+    def meet_name(self):
+        return self.meet_create['meetname']
+
+    def add(self, step, items):
+        items = list(items)
+        if len(items) > 0:
+            self.steps.setdefault(step, []).extend(items)
+
+    def ordered_steps(self):
+        return [(step, self.steps[step]) for step in PLAN_STEPS if step in self.steps]
+
+    def is_empty(self):
+        return len(self.steps) == 0
+
+    def summary(self):
+        lines = ['Plan for %s, created %s' % (self.meet_name, self.created_at)]
+        for step, items in self.ordered_steps():
+            lines.append('  %-14s %8d' % (step, len(items)))
+        if self.is_empty():
+            lines.append('  nothing to send')
+        return '\n'.join(lines)
+
+    def write(self, plan_file):
+        plan = {
+            'version': PLAN_VERSION,
+            'created_at': self.created_at,
+            'meet_create': self.meet_create,
+            'digests': self.digests,
+            'steps': self.steps,
+            'teams_query': self.teams_query,
+        }
+
+        with gzip.open(plan_file, 'wb') as f:
+            f.write(dumps(plan))
+
+    @classmethod
+    def read(cls, plan_file):
+        with gzip.open(plan_file, 'rb') as f:
+            plan = loads(f.read())
+
+        if plan.get('version') != PLAN_VERSION:
+            raise ValueError('%s is not a version %d import plan' % (plan_file, PLAN_VERSION))
+
+        return cls(plan['meet_create'], plan['digests'], plan['steps'], plan['created_at'], plan.get('teams_query'))
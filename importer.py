@@ -0,0 +1,1268 @@
+
+from date_helper import parse_hytek_dates, to_sql_date, get_hytek_dobs
+from table_reader import get_table_reader
+from snapshot import extract_snapshot
+from event_mapping import DEFAULT_EVENT_MAPPING, program_number
+from watch import result_key
+from hytek_records import MeetRecord, ResultRecord
+from openmeet_client import OpenMeetClient
+from bulk_upload import BulkUploader, report_failed_chunks
+from instrumentation import ImportProfile
+from json_codec import response_json
+from import_plan import ImportPlan, resolve_refs, is_ref, parse_ref, meet_ref, team_ref, athlete_ref, entry_ref
+from import_cache import ImportChanges, snapshot_digests, section_digests, section_row_key
+
+# Entry fields compared against OpenMeet to find entries that need updating
+ENTRY_UPDATE_FIELDS = ('seed_time', 'scratched', 'team_id')
+
+# Relay team fields compared against OpenMeet to find relays that need updating
+RELAY_UPDATE_FIELDS = ('seed_time', 'scratched', 'members')
+
+
+def entry_field_changed(field, existing_value, new_value):
+    if field == 'seed_time' and existing_value is not None and new_value is not None:
+        return round(float(existing_value), 2) != round(float(new_value), 2)
+    if field == 'scratched':
+        return bool(existing_value) != bool(new_value)
+    if field == 'members':
+        return relay_legs(existing_value) != relay_legs(new_value)
+    return existing_value != new_value
+
+
+def relay_legs(members):
+    return sorted((x['leg'], x['athlete_id']) for x in members or [])
+
+
+class HytekDbImporter:
+
+    def __init__(self, db_file, reader=None, cache=None, client=None, uploader=None, teams_view=None,
+                 team_lookup=False, event_mapping=None):
+        self.db_file = db_file
+        # Applying a plan reads no Hy-Tek tables, so there is no database or reader
+        if reader is None and db_file is not None:
+            reader = get_table_reader(db_file)
+        self.reader = reader
+        self.cache = cache
+        self.client = client if client is not None else OpenMeetClient()
+        self.uploader = uploader if uploader is not None else BulkUploader(self.client)
+        self.teams_view = teams_view
+        self.team_lookup = team_lookup
+        self.event_mapping = event_mapping if event_mapping is not None else DEFAULT_EVENT_MAPPING
+        self.sent_counts = {'entries': 0, 'entry updates': 0, 'results': 0, 'relay teams': 0,
+                            'relay updates': 0, 'relay results': 0}
+        self.profile = ImportProfile()
+        self.snapshot = None
+        self.hytek_events_db = []
+        self.hytek_teams_db = []
+        self.hytek_athletes_db = []
+        self.hytek_relay_teams_db = []
+        self.openmeet_meet = {}
+        self.openmeet_teams_db = []
+        self.openmeet_athletes_db = []
+        self.openmeet_events = []
+        self.openmeet_entries_db = []
+        self.openmeet_entries_loaded = False
+        self.openmeet_relays_db = []
+        self.teams_query = None
+
+        # Lookup indexes, kept in step with the lists above
+        self.hytek_events_index = {}        # Event_ptr -> event row
+        self.hytek_teams_index = {}         # Team_no -> team row
+        self.hytek_athletes_index = {}      # Ath_no -> athlete row
+        self.hytek_relay_names_index = {}   # Relay_no -> relayname rows ordered by Pos_no
+        self.hytek_entry_splits_index = {}  # (Event_ptr, Ath_no) -> final split rows ordered by Split_no
+        self.hytek_relay_splits_index = {}  # Relay_no -> final split rows ordered by Split_no
+        self.openmeet_teams_index = {}      # abbreviation -> team
+        self.openmeet_members_index = {}    # (abbreviation, member_number) -> athlete
+        self.openmeet_athletes_index = {}   # member_number -> athlete
+        self.openmeet_entries_index = {}    # (program_number, athlete_id) -> entry
+        self.openmeet_relays_index = {}     # (program_number, team_id, letter) -> relay team
+
+    def add_hytek_event(self, event):
+        self.hytek_events_db.append(event)
+        self.hytek_events_index.setdefault(event.Event_ptr, event)
+
+    def add_hytek_team(self, team):
+        self.hytek_teams_db.append(team)
+        self.hytek_teams_index.setdefault(team.Team_no, team)
+
+    def add_hytek_athlete(self, athlete):
+        self.hytek_athletes_db.append(athlete)
+        self.hytek_athletes_index.setdefault(athlete.Ath_no, athlete)
+
+    def set_hytek_relay_names(self, relay_names):
+        self.hytek_relay_names_index = {}
+
+        for relay_name in relay_names:
+            self.hytek_relay_names_index.setdefault(relay_name.Relay_no, []).append(relay_name)
+
+        for legs in self.hytek_relay_names_index.values():
+            legs.sort(key=lambda x: x.Pos_no)
+
+    def set_hytek_splits(self, split_rows):
+        self.hytek_entry_splits_index = {}
+        self.hytek_relay_splits_index = {}
+
+        for split_row in split_rows:
+            # Only finals are imported, prelim and semi final splits are skipped
+            if split_row.Rnd_ltr not in (None, '', 'F'):
+                continue
+
+            if split_row.Relay_no:
+                self.hytek_relay_splits_index.setdefault(split_row.Relay_no, []).append(split_row)
+            else:
+                self.hytek_entry_splits_index.setdefault(result_key(split_row), []).append(split_row)
+
+        for index in [self.hytek_entry_splits_index, self.hytek_relay_splits_index]:
+            for splits in index.values():
+                splits.sort(key=lambda x: x.Split_no)
+
+    def set_openmeet_teams(self, teams):
+        self.openmeet_teams_db = teams
+        self.openmeet_athletes_db = []
+        self.openmeet_teams_index = {}
+        self.openmeet_members_index = {}
+        self.openmeet_athletes_index = {}
+
+        for team in teams:
+            self.openmeet_teams_index.setdefault(team['abbreviation'], team)
+            for member in team['members']:
+                self.add_openmeet_athlete(member, team['abbreviation'])
+
+    def add_openmeet_athlete(self, athlete, abbreviation):
+        self.openmeet_athletes_db.append(athlete)
+        self.openmeet_members_index.setdefault((abbreviation, athlete['member_number']), athlete)
+        self.openmeet_athletes_index[athlete['member_number']] = athlete
+
+    def set_openmeet_entries(self, entries):
+        self.openmeet_entries_db = []
+        self.openmeet_entries_index = {}
+        self.openmeet_entries_loaded = True
+
+        for entry in entries:
+            self.add_openmeet_entry(entry)
+
+    def update_openmeet_entry(self, entry):
+        existing_entry = self.find_openmeet_entry(entry['program_number'], entry['athlete_id'])
+        if existing_entry is None:
+            self.add_openmeet_entry(entry)
+        else:
+            existing_entry.update(entry)
+
+    def add_openmeet_entry(self, entry):
+        self.openmeet_entries_db.append(entry)
+        self.openmeet_entries_index.setdefault((str(entry['program_number']), entry['athlete_id']), entry)
+
+    def set_openmeet_relays(self, relays):
+        self.openmeet_relays_db = []
+        self.openmeet_relays_index = {}
+
+        for relay in relays:
+            self.add_openmeet_relay(relay)
+
+    def update_openmeet_relay(self, relay):
+        existing_relay = self.find_openmeet_relay(relay['program_number'], relay['team_id'], relay['letter'])
+        if existing_relay is None:
+            self.add_openmeet_relay(relay)
+        else:
+            existing_relay.update(relay)
+
+    def add_openmeet_relay(self, relay):
+        self.openmeet_relays_db.append(relay)
+        self.openmeet_relays_index.setdefault((str(relay['program_number']), relay['team_id'], relay['letter']), relay)
+
+    def load_snapshot(self, snapshot=None):
+        # Read every table once, up front, unless a snapshot is handed in
+        if snapshot is None:
+            snapshot = extract_snapshot(self.reader)
+        self.snapshot = snapshot
+        return snapshot
+
+    def read_table(self, table_name):
+        if self.snapshot is None:
+            self.load_snapshot()
+        return self.snapshot.table(table_name)
+
+    def find_hytek_team(self, team_no):
+        return self.hytek_teams_index.get(team_no)
+
+    def find_hytek_athlete(self, ath_no):
+        return self.hytek_athletes_index.get(ath_no)
+
+    def find_hytek_event(self, event_ptr):
+        return self.hytek_events_index.get(event_ptr)
+
+    def find_openmeet_team(self, abbreviation):
+        return self.openmeet_teams_index.get(abbreviation)
+
+    def find_openmeet_member(self, abbreviation, reg_no):
+        return self.openmeet_members_index.get((abbreviation, reg_no))
+
+    def find_openmeet_athlete(self, reg_no):
+        return self.openmeet_athletes_index.get(reg_no)
+
+    def find_openmeet_entry(self, program_number, athlete_id):
+        return self.openmeet_entries_index.get((str(program_number), athlete_id))
+
+    def find_openmeet_relay(self, program_number, team_id, letter):
+        return self.openmeet_relays_index.get((str(program_number), team_id, letter))
+
+    def get_meet_setup(self):
+        meet_row = self.read_table('meet')[0]
+        start_date, end_date, deadline, age_up_date = parse_hytek_dates([meet_row.Meet_start, meet_row.Meet_end,
+                                                                         meet_row.entry_deadline, meet_row.Calc_date])
+
+        meet_create = {
+            'meetname': meet_row.Meet_name1,
+            'startdate': to_sql_date(start_date),
+            'enddate': to_sql_date(end_date),
+            'deadline': deadline.isoformat(),
+            'max_individual_events': meet_row.indmax_perath,
+            'max_relay_events': meet_row.relmax_perath,
+            'max_total_events': meet_row.entrymax_total,
+            'age_up_date': to_sql_date(age_up_date),
+        }
+
+        events = []
+        mapping = self.event_mapping
+
+        for event_row in self.read_table('event'):
+            self.add_hytek_event(event_row)
+
+            # pprint(event_row)
+            event = {
+                'event_type': mapping.event_type(meet_row.Meet_class, event_row),
+                'event_order': int(event_row.Event_no),
+                'program_number': program_number(event_row),
+                'discipline': mapping.discipline(event_row),
+                'distance': mapping.distance(meet_row.Meet_course, event_row),
+                'legs': mapping.legs(event_row)
+            }
+
+            events.append(event)
+
+        meet_create['events'] = events
+
+        return meet_create
+
+
+    def get_teams(self):
+
+        teams = []
+
+        for team_row in self.read_table('team'):
+            self.add_hytek_team(team_row)
+
+            team = {
+                'team_id': team_row.Team_no,
+                'team_name': team_row.Team_name,
+                'abbreviation': team_row.Team_abbr,
+                'members': []
+            }
+
+            teams.append(team)
+
+        return teams
+
+
+    def get_athletes(self, teams):
+        teams_by_id = {team['team_id']: team for team in teams}
+        athlete_rows = self.read_table('athlete')
+        dobs = get_hytek_dobs([x.Birth_date for x in athlete_rows])
+
+        for athlete_row, dob in zip(athlete_rows, dobs):
+            self.add_hytek_athlete(athlete_row)
+
+            team = teams_by_id.get(athlete_row.Team_no)
+
+            athlete = {
+                'athlete_id': athlete_row.Comp_no,
+                'surname': athlete_row.Last_name,
+                'first_name': athlete_row.First_name,
+                'other_names': athlete_row.Initial,
+                'preferred_name': athlete_row.Pref_name,
+                'sex': athlete_row.Ath_Sex,
+                'dob': to_sql_date(dob),
+                'age': athlete_row.Ath_age,
+                'member_number': athlete_row.Reg_no,
+                'team_id': athlete_row.Team_no
+            }
+
+            team['members'].append(athlete)
+
+    def build_entry(self, entry_row):
+
+        # Find Team and Athlete information
+        hytek_athlete = self.find_hytek_athlete(entry_row.Ath_no)
+        hytek_team = self.find_hytek_team(hytek_athlete.Team_no)
+
+        # Find OpenMeet team and athlete
+        team = self.find_openmeet_team(hytek_team.Team_abbr)
+        athlete = self.find_openmeet_member(team['abbreviation'], hytek_athlete.Reg_no)
+
+        meet_event = self.find_hytek_event(entry_row.Event_ptr)
+
+        if meet_event is None:
+            print('Error unable to find event %s' % entry_row.Event_ptr)
+            # TODO: Raise exception
+
+        existing_entry = self.find_openmeet_entry(program_number(meet_event), athlete['athlete_id'])
+
+        seed_time = None
+        if entry_row.ConvSeed_time is not None:
+            seed_time = entry_row.ConvSeed_time
+        elif entry_row.ActualSeed_time is not None:
+            seed_time = entry_row.ActualSeed_time
+
+        entry = {
+            'athlete_id': athlete['athlete_id'],
+            'meet_id': self.openmeet_meet['meet_id'],
+            'team_id': team['team_id'],
+            'program_number': program_number(meet_event),
+            'seed_time': seed_time,
+            'status_code': 'ENTERED',
+            'scratched': entry_row.Scr_stat
+        }
+
+        return existing_entry, entry
+
+    def get_entries(self, entry_rows=None):
+        if entry_rows is None:
+            entry_rows = self.read_table('entry')
+
+        for entry_row in entry_rows:
+            existing_entry, entry = self.build_entry(entry_row)
+
+            if existing_entry is not None:
+                # print("Found existing entry for %s in event %s" % (entry['athlete_id'], entry['program_number']))
+
+                # Changes to existing entries are sent by get_entry_updates
+                continue
+
+            # print("Create entry for %s in event %s" % (entry['athlete_id'], entry['program_number']))
+
+            yield entry
+
+    def get_entry_updates(self, entry_rows=None):
+        if entry_rows is None:
+            entry_rows = self.read_table('entry')
+
+        for entry_row in entry_rows:
+            existing_entry, entry = self.build_entry(entry_row)
+
+            if existing_entry is None:
+                continue
+
+            update = {}
+            for field in ENTRY_UPDATE_FIELDS:
+                if entry_field_changed(field, existing_entry.get(field), entry[field]):
+                    update[field] = entry[field]
+
+            if len(update) > 0:
+                update['entry_id'] = existing_entry['entry_id']
+                yield update
+
+
+    def build_relay_team(self, relay_team_row):
+        # Find OpenMeet team and athlete
+        hytek_team = self.find_hytek_team(relay_team_row.Team_no)
+        openmeet_team = self.find_openmeet_team(hytek_team.Team_abbr)
+        hytek_event = self.find_hytek_event(relay_team_row.Event_ptr)
+
+        # Get names for this relay
+        relay_members_new = []
+        for relay_name_row in self.hytek_relay_names_index.get(relay_team_row.Relay_no, []):
+            hytek_athlete = self.find_hytek_athlete(relay_name_row.Ath_no)
+
+            openmeet_athlete = self.find_openmeet_athlete(hytek_athlete.Reg_no)
+
+            relay_member_new = {
+                'leg': relay_name_row.Pos_no,
+                'athlete_id': openmeet_athlete['athlete_id']
+            }
+
+            relay_members_new.append(relay_member_new)
+
+        relay_team_new = {
+            'meet_id': self.openmeet_meet['meet_id'],
+            'program_number': program_number(hytek_event),
+            'team_id': openmeet_team['team_id'],
+            'seed_time': relay_team_row.ConvSeed_time,
+            'letter': relay_team_row.Team_ltr,
+            'scratched':  relay_team_row.Scr_stat,
+            'status_code': 'ENTERED',
+            'members': relay_members_new
+        }
+
+        existing_relay = self.find_openmeet_relay(relay_team_new['program_number'], relay_team_new['team_id'],
+                                                  relay_team_new['letter'])
+
+        return existing_relay, relay_team_new
+
+    def get_relay_teams(self, relay_rows=None):
+        if relay_rows is None:
+            relay_rows = self.read_table('relay')
+
+        self.set_hytek_relay_names(self.read_table('relaynames'))
+
+        relay_teams_new = []
+
+        for relay_team_row in relay_rows:
+            self.hytek_relay_teams_db.append(relay_team_row)
+
+            existing_relay, relay_team_new = self.build_relay_team(relay_team_row)
+
+            # Changes to relays already in OpenMeet are sent by get_relay_updates
+            if existing_relay is None:
+                relay_teams_new.append(relay_team_new)
+
+        return relay_teams_new
+
+    def get_relay_updates(self, relay_rows=None):
+        if relay_rows is None:
+            relay_rows = self.read_table('relay')
+
+        self.set_hytek_relay_names(self.read_table('relaynames'))
+
+        relay_updates = []
+
+        for relay_team_row in relay_rows:
+            existing_relay, relay_team = self.build_relay_team(relay_team_row)
+
+            if existing_relay is None:
+                continue
+
+            update = {}
+            for field in RELAY_UPDATE_FIELDS:
+                if entry_field_changed(field, existing_relay.get(field), relay_team[field]):
+                    update[field] = relay_team[field]
+
+            if len(update) > 0:
+                update['relay_id'] = existing_relay['relay_id']
+                relay_updates.append(update)
+
+        return relay_updates
+
+
+    def get_individual_results(self, entry_rows=None):
+        if entry_rows is None:
+            entry_rows = self.read_table('entry')
+
+        self.set_hytek_splits(self.read_table('split'))
+
+        for entry_row in entry_rows:
+
+            # Find Team and Athlete information
+            hytek_athlete = self.find_hytek_athlete(entry_row.Ath_no)
+            hytek_team = self.find_hytek_team(hytek_athlete.Team_no)
+
+            # Find OpenMeet team and athlete
+            team = self.find_openmeet_team(hytek_team.Team_abbr)
+            athlete = self.find_openmeet_member(team['abbreviation'], hytek_athlete.Reg_no)
+
+            meet_event = self.find_hytek_event(entry_row.Event_ptr)
+
+            if meet_event is None:
+                print('Error unable to find event %s' % entry_row.Event_ptr)
+                # TODO: Raise exception
+
+            openmeet_entry = self.find_openmeet_entry(program_number(meet_event), athlete['athlete_id'])
+
+            entry_results = self.build_results({'entry_id': openmeet_entry['entry_id']}, entry_row,
+                                               self.hytek_entry_splits_index.get(result_key(entry_row), []))
+
+            # Don't add full null results
+            if entry_results is None:
+                continue
+
+            yield entry_results
+
+
+    def get_cached_results(self, entry_rows, entry_ids):
+        # Results for entries whose OpenMeet entry_id is known from the last full import
+        for entry_row in entry_rows:
+            entry_results = self.build_results({'entry_id': entry_ids[result_key(entry_row)]}, entry_row)
+
+            if entry_results is not None:
+                yield entry_results
+
+
+    def build_results(self, result_id, result_row, split_rows=None):
+        # result_id holds the fields that identify the entry or relay in OpenMeet
+        final_time = result_row.Fin_Time
+        pad_time = result_row.Fin_pad
+        backup1_time = result_row.Fin_back1
+        backup2_time = result_row.Fin_back2
+        backup3_time = result_row.Fin_back3
+
+        # Nullify any 0 times
+        final_time_result = None
+        if final_time is not None and final_time != 0:
+            final_time_result = dict(result_id, meet_id=self.openmeet_meet['meet_id'], seconds=final_time)
+
+        heat_time_results = []
+
+        for time_type_code, heat_time in [('PAD', pad_time), ('BACKUP1', backup1_time), ('BACKUP2', backup2_time),
+                                          ('BACKUP3', backup3_time)]:
+            if heat_time is not None and heat_time != 0:
+                heat_time_results.append(dict(result_id, meet_id=self.openmeet_meet['meet_id'], seconds=heat_time,
+                                              time_type_code=time_type_code))
+
+        splits = None
+        if split_rows is not None:
+            splits = [{'split_number': x.Split_no, 'seconds': x.Split_Time}
+                      for x in split_rows if x.Split_Time is not None and x.Split_Time != 0]
+
+        # Don't add full null results
+        if final_time_result is None and len(heat_time_results) == 0 and not splits:
+            return None
+
+        # if final_time_result is None:
+        #     print('final time result is none')
+        #     pprint(final_time_result)
+
+        results = dict(result_id, meet_id=self.openmeet_meet['meet_id'], final_result=final_time_result,
+                       heat_results=heat_time_results)
+
+        # Without split rows the splits already in OpenMeet are left alone
+        if splits is not None:
+            results['splits'] = splits
+
+        return results
+
+
+    def get_relay_results(self, relay_rows=None):
+        if relay_rows is None:
+            relay_rows = self.read_table('relay')
+
+        self.set_hytek_splits(self.read_table('split'))
+
+        for relay_team_row in relay_rows:
+            hytek_team = self.find_hytek_team(relay_team_row.Team_no)
+            openmeet_team = self.find_openmeet_team(hytek_team.Team_abbr)
+            hytek_event = self.find_hytek_event(relay_team_row.Event_ptr)
+
+            # Relays are identified the same way they were posted
+            relay_id = {
+                'program_number': program_number(hytek_event),
+                'team_id': openmeet_team['team_id'],
+                'letter': relay_team_row.Team_ltr,
+            }
+
+            relay_results = self.build_results(relay_id, relay_team_row,
+                                               self.hytek_relay_splits_index.get(relay_team_row.Relay_no, []))
+
+            if relay_results is not None:
+                yield relay_results
+
+
+    def get_existing_entries(self, meet_id):
+        return self.read_existing_entries(self.client.get("/meet/%d/entries" % meet_id))
+
+
+    def read_existing_entries(self, response):
+        if response.status_code == 200:
+            self.set_openmeet_entries(response_json(response)['data'])
+            return True
+        else:
+            print('Error retrieving existing entries')
+            print(response.status_code)
+            print(response.text)
+            exit()
+
+
+    def post_entries(self, entries):
+        chunk_results = self.uploader.post("/meet/%s/entries" % self.openmeet_meet['meet_id'], entries)
+        return self.merge_created_entries(chunk_results)
+
+
+    def merge_created_entries(self, chunk_results):
+        # Merge the created entries, with their new entry ids, into the entry DB
+        for chunk_result in chunk_results:
+            if chunk_result.ok:
+                for entry in chunk_result.data():
+                    self.add_openmeet_entry(entry)
+
+        return self.record_upload('entries', chunk_results)
+
+
+    def patch_entries(self, entry_updates):
+        chunk_results = self.uploader.patch("/meet/%s/entries" % self.openmeet_meet['meet_id'], entry_updates)
+        return self.merge_updated_entries(chunk_results)
+
+
+    def merge_updated_entries(self, chunk_results):
+        for chunk_result in chunk_results:
+            if chunk_result.ok:
+                for entry in chunk_result.data():
+                    self.update_openmeet_entry(entry)
+
+        return self.record_upload('entry updates', chunk_results)
+
+
+    def put_individual_results(self, individual_results):
+        chunk_results = self.uploader.put("/meet/%s/results" % self.openmeet_meet['meet_id'], individual_results)
+        return self.record_upload('results', chunk_results)
+
+
+    def get_existing_relays(self, meet_id):
+        return self.read_existing_relays(self.client.get("/meet/%d/relays" % meet_id))
+
+
+    def read_existing_relays(self, response):
+        if response.status_code == 200:
+            self.set_openmeet_relays(response_json(response)['data'])
+            return True
+        else:
+            print('Error retrieving existing relays')
+            print(response.status_code)
+            print(response.text)
+            exit()
+
+
+    def post_relay_teams(self, relay_teams):
+        chunk_results = self.uploader.post("/meet/%s/relays" % self.openmeet_meet['meet_id'], relay_teams)
+        return self.merge_created_relays(chunk_results)
+
+
+    def merge_created_relays(self, chunk_results):
+        for chunk_result in chunk_results:
+            if chunk_result.ok:
+                for relay in chunk_result.data():
+                    self.add_openmeet_relay(relay)
+
+        return self.record_upload('relay teams', chunk_results)
+
+
+    def patch_relay_teams(self, relay_updates):
+        chunk_results = self.uploader.patch("/meet/%s/relays" % self.openmeet_meet['meet_id'], relay_updates)
+        return self.merge_updated_relays(chunk_results)
+
+
+    def merge_updated_relays(self, chunk_results):
+        for chunk_result in chunk_results:
+            if chunk_result.ok:
+                for relay in chunk_result.data():
+                    self.update_openmeet_relay(relay)
+
+        return self.record_upload('relay updates', chunk_results)
+
+
+    def put_relay_results(self, relay_results):
+        chunk_results = self.uploader.put("/meet/%s/relays/results" % self.openmeet_meet['meet_id'], relay_results)
+        return self.record_upload('relay results', chunk_results)
+
+
+    def record_upload(self, description, chunk_results):
+        self.sent_counts[description] = self.sent_counts.get(description, 0) + sum(len(x.items) for x in chunk_results
+                                                                                    if x.ok)
+        return report_failed_chunks(description, chunk_results)
+
+
+    def find_openmeet_meet(self, meet_create):
+        # Check if meet already exists, None when it doesn't
+        return self.read_openmeet_meet(self.client.get('/meet', params={'meetname': meet_create['meetname']}))
+
+
+    def read_openmeet_meet(self, meet_response):
+        if meet_response.status_code == 404:
+            print("Meet doesn't exist")
+            return None
+
+        elif meet_response.status_code== 200:
+            print('Meet does exist')
+
+            return response_json(meet_response)['data']
+
+        print('Error creating or retrieving meet')
+        print(meet_response.status_code)
+        print(meet_response.text)
+        exit()
+
+
+    def create_openmeet_meet(self, meet_create):
+        return self.read_created_meet(self.client.post('/meet', meet_create))
+
+
+    def read_created_meet(self, r):
+        if r.status_code != 200:
+            print('Error creating meet')
+            print(r.status_code)
+            print(r.text)
+            exit()
+
+        return response_json(r)['data']
+
+
+    def get_openmeet_meet(self, meet_create):
+        meet = self.find_openmeet_meet(meet_create)
+
+        if meet is None:
+            meet = self.create_openmeet_meet(meet_create)
+
+        return meet
+
+
+    def diff_teams(self, teams, teams_data):
+        teams_by_abbreviation = {x['abbreviation']: x for x in reversed(teams_data)}
+        teams_by_name = {x['team_name']: x for x in reversed(teams_data)}
+
+        teams_to_add = []
+        members_to_add = []
+        for team in teams:
+            # Find this team in team database by abbreviation
+            existing_team = teams_by_abbreviation.get(team['abbreviation'])
+
+            if existing_team is None:
+                existing_team = teams_by_name.get(team['team_name'])
+
+                if existing_team is not None:
+                    # TODO: report exception
+                    print("Found existing team %s with different abbreviation: OpenMeet=%s Hytek MM=%s" % (existing_team['team_name'],
+                                                                                                           existing_team['abbreviation'],
+                                                                                                           team['abbreviation']))
+
+            if existing_team is None:
+                teams_to_add.append(team)
+            else:
+                # print("Found existing team %s(%s)" % (existing_team['team_name'], existing_team['abbreviation']))
+                # Compare team members
+                existing_members = set(x['member_number'] for x in existing_team['members'])
+                for member in team['members']:
+                    if member['member_number'] not in existing_members:
+                        # print('Found existing athlete %s, %s(%s)' % (member['surname'],
+                        #                                              member['first_name'],
+                        #                                              member['member_number']))
+                    # else:
+                    #     print('Adding athlete %s, %s(%s)' % (member['surname'],
+                    #                                          member['first_name'],
+                    #                                          member['member_number']))
+                        members_to_add.append(member)
+
+        return teams_to_add, members_to_add
+
+
+    def openmeet_teams_query(self):
+        # Only the teams and athletes in this Hy-Tek file, or in the plan being applied
+        if self.teams_query is not None:
+            return self.teams_query
+
+        return {
+            'abbreviations': sorted(set(x.Team_abbr for x in self.hytek_teams_db)),
+            'team_names': sorted(set(x.Team_name for x in self.hytek_teams_db)),
+            'member_numbers': sorted(set(x.Reg_no for x in self.hytek_athletes_db)),
+        }
+
+
+    def openmeet_teams_request(self):
+        if self.team_lookup:
+            return 'POST', '/teams/lookup', self.openmeet_teams_query()
+        return 'GET', '/teams', None
+
+
+    def fetch_openmeet_teams(self):
+        if self.teams_view is not None:
+            return self.teams_view.get()
+
+        method, path, payload = self.openmeet_teams_request()
+        return self.read_openmeet_teams(self.client.request(method, path, payload=payload))
+
+
+    def read_openmeet_teams(self, teams_request):
+        if teams_request.status_code != 200:
+            print('Error retrieving teams')
+            print(teams_request.status_code)
+            print(teams_request.text)
+            exit()
+
+        return response_json(teams_request)['data']
+
+
+    def sync_teams(self, teams):
+        if self.teams_view is None:
+            self.post_teams(teams)
+            return
+
+        # Diff and post while holding the shared view so other meets see the new teams
+        with self.teams_view.lock:
+            if self.post_teams(teams):
+                self.teams_view.invalidate()
+
+
+    def post_teams(self, teams):
+        team_posts = self.team_posts(teams, self.fetch_openmeet_teams())
+
+        # Post teams to backend
+        for description, path, items in team_posts:
+            self.check_team_post(description, self.client.post(path, items))
+
+        return len(team_posts) > 0
+
+
+    def team_posts(self, teams, teams_data):
+        # (description, path, items) of the team and athlete posts needed, skipping empty ones
+        teams_to_add, members_to_add = self.diff_teams(teams, teams_data)
+        posts = [('teams', '/teams', teams_to_add), ('athletes', '/athletes', members_to_add)]
+        return [x for x in posts if len(x[2]) > 0]
+
+
+    def check_team_post(self, description, r):
+        if r.status_code != 200:
+            print('Error adding %s' % description)
+            print(r.status_code)
+            print(r.text)
+            exit()
+
+
+    def load_openmeet_teams(self):
+        # Get DB of all teams and entrants, and populate Openmeet Team and Athlete DB
+        self.set_openmeet_teams(self.fetch_openmeet_teams())
+
+
+    def cache_key(self, meet_name):
+        # The same meet name on another OpenMeet server is a different import
+        return '%s %s' % (self.client.base_url, meet_name)
+
+
+    def get_changes(self, meet_create, meet):
+        # Compare against the last successful import of this meet, meet is None when it doesn't exist yet
+        digests = snapshot_digests(self.snapshot)
+        previous_digests = None
+
+        if self.cache is not None:
+            cache_key = self.cache_key(meet_create['meetname'])
+            previous_digests = self.cache.load(cache_key)
+
+            # Rows already sent to a meet that has since been deleted or replaced must be sent again
+            if previous_digests is not None and (meet is None or meet['meet_id'] != self.cache.load_meet_id(cache_key)):
+                print('%s is not the meet last imported, importing everything' % meet_create['meetname'])
+                previous_digests = None
+
+        return digests, ImportChanges(previous_digests, digests)
+
+
+    def save_changes(self, meet_create, digests, failed_chunks):
+        # Rows in failed chunks must be sent again next time
+        if self.cache is not None and failed_chunks == 0:
+            cache_key = self.cache_key(meet_create['meetname'])
+            self.cache.save(cache_key, digests)
+            self.cache.save_meet_id(cache_key, self.openmeet_meet['meet_id'])
+
+            # Entry IDs are only known when this run fetched the meet's entries
+            if self.openmeet_entries_loaded:
+                self.cache.save_entry_ids(cache_key, self.openmeet_meet['meet_id'], self.get_entry_ids())
+
+
+    def get_entry_ids(self):
+        # (Event_ptr, Ath_no) -> OpenMeet entry_id of every entry already in OpenMeet
+        entry_ids = {}
+
+        for entry_row in self.read_table('entry'):
+            existing_entry, entry = self.build_entry(entry_row)
+            if existing_entry is not None:
+                entry_ids[result_key(entry_row)] = existing_entry['entry_id']
+
+        return entry_ids
+
+
+    def push_results_only(self):
+        # Refresh results using the entry IDs cached by the last full import, without touching
+        # the meet, teams, athletes or entries. Falls back to a full import when that isn't enough.
+        profile = self.profile
+
+        with profile.phase('read results'):
+            meet_row = MeetRecord.from_row(next(iter(self.reader.read_table('meet'))))
+            meet_name = meet_row.Meet_name1
+            cache_key = self.cache_key(meet_name)
+            cached = self.cache.load_entry_ids(cache_key) if self.cache is not None else None
+
+            if cached is None:
+                print('No cached entry IDs for %s, running a full import' % meet_name)
+                return self.open_hytek_db()
+
+            meet_id, entry_ids = cached
+            result_rows = [ResultRecord.from_row(x) for x in self.reader.read_table('entry')]
+            profile.count_rows('hytek entry', len(result_rows))
+
+        with profile.phase('changes'):
+            digests = section_digests('result', result_rows)
+            previous_digests = self.cache.load_section(cache_key, 'result')
+            changed_rows = []
+            for result_row in result_rows:
+                row_key = section_row_key('result', result_row)
+                if previous_digests.get(row_key) != digests[row_key]:
+                    changed_rows.append(result_row)
+
+        if len(changed_rows) == 0:
+            print('No changed results')
+            return 0
+
+        missing = sum(1 for x in changed_rows if result_key(x) not in entry_ids)
+        if missing > 0:
+            print('%d changed results have no cached entry ID, running a full import' % missing)
+            return self.open_hytek_db()
+
+        with profile.phase('meet'):
+            meet = self.find_openmeet_meet({'meetname': meet_name})
+
+        if meet is None or meet['meet_id'] != meet_id:
+            print('%s is not the meet last imported, running a full import' % meet_name)
+            return self.open_hytek_db()
+
+        self.openmeet_meet = meet
+
+        with profile.phase('results'):
+            failed_chunks = self.put_individual_results(self.get_cached_results(changed_rows, entry_ids))
+
+        if failed_chunks == 0:
+            self.cache.save_section(cache_key, 'result', digests)
+
+        profile.count_rows('sent results', self.sent_counts['results'])
+        print('Pushed %d changed results' % self.sent_counts['results'])
+
+        return failed_chunks
+
+
+    def teams_to_sync(self, teams, changes):
+        if not changes.section_changed('team', 'athlete'):
+            return None
+
+        if changes.is_first_import():
+            return teams
+
+        # Only check teams and athletes that changed since the last import
+        changed_athletes = changes.changed_rows('athlete', self.hytek_athletes_db)
+        changed_team_nos = set(x.Team_no for x in changes.changed_rows('team', self.hytek_teams_db))
+        changed_team_nos.update(x.Team_no for x in changed_athletes)
+        changed_reg_nos = set(x.Reg_no for x in changed_athletes)
+
+        teams = [x for x in teams if x['team_id'] in changed_team_nos]
+        for team in teams:
+            team['members'] = [x for x in team['members'] if x['member_number'] in changed_reg_nos]
+
+        return teams
+
+
+    def entry_rows_to_send(self, changes):
+        if changes.section_changed('event', 'team', 'athlete'):
+            return self.read_table('entry')
+        if changes.section_changed('entry'):
+            return changes.changed_rows('entry', self.read_table('entry'))
+        return None
+
+
+    def result_rows_to_send(self, changes):
+        if changes.section_changed('result', 'split'):
+            split_keys = set(result_key(x) for x in changes.changed_rows('split', self.read_table('split'))
+                             if not x.Relay_no)
+            return [x for x in self.read_table('entry')
+                    if changes.row_changed('result', x) or result_key(x) in split_keys]
+        return None
+
+
+    def relay_rows_to_send(self, changes):
+        # Relays are compared with those already in OpenMeet, so sending a relay that hasn't
+        # changed only costs the comparison
+        if changes.section_changed('event', 'team'):
+            return self.read_table('relay')
+        if changes.section_changed('relay', 'relaynames', 'athlete'):
+            changed_ath_nos = set(x.Ath_no for x in changes.changed_rows('athlete', self.hytek_athletes_db))
+            changed_relay_nos = set(x.Relay_no for x in self.read_table('relaynames')
+                                    if changes.row_changed('relaynames', x) or x.Ath_no in changed_ath_nos)
+            return [x for x in self.read_table('relay')
+                    if x.Relay_no in changed_relay_nos or changes.row_changed('relay', x)]
+        return None
+
+
+    def relay_result_rows_to_send(self, changes):
+        if changes.section_changed('relay', 'relay_result', 'split'):
+            split_relay_nos = set(x.Relay_no for x in changes.changed_rows('split', self.read_table('split'))
+                                  if x.Relay_no)
+            return [x for x in self.read_table('relay')
+                    if x.Relay_no in split_relay_nos or changes.row_changed('relay_result', x)
+                    or changes.row_changed('relay', x)]
+        return None
+
+
+    def with_planned_teams(self, teams_data, teams_to_add, members_to_add):
+        # OpenMeet teams as they will be once the plan's teams and athletes are added, with
+        # references in place of the IDs OpenMeet hasn't assigned yet
+        teams_data = [dict(x, members=list(x['members'])) for x in teams_data]
+        teams_by_abbreviation = {x['abbreviation']: x for x in reversed(teams_data)}
+        teams_by_name = {x['team_name']: x for x in reversed(teams_data)}
+
+        for team in teams_to_add:
+            team_id = team_ref(team['abbreviation'])
+            members = [dict(x, athlete_id=athlete_ref(team['abbreviation'], x['member_number']), team_id=team_id)
+                       for x in team['members']]
+            teams_data.append(dict(team, team_id=team_id, members=members))
+
+        for member in members_to_add:
+            hytek_team = self.find_hytek_team(member['team_id'])
+            team = teams_by_abbreviation.get(hytek_team.Team_abbr)
+            if team is None:
+                team = teams_by_name.get(hytek_team.Team_name)
+
+            team['members'].append(dict(member, athlete_id=athlete_ref(team['abbreviation'], member['member_number']),
+                                        team_id=team['team_id']))
+
+        return teams_data
+
+
+    def build_plan(self):
+        # Everything open_hytek_db would send, worked out with read only requests
+        if self.snapshot is None:
+            self.load_snapshot()
+
+        meet_create = self.get_meet_setup()
+        meet = self.find_openmeet_meet(meet_create)
+        digests, changes = self.get_changes(meet_create, meet)
+        plan = ImportPlan(meet_create, digests)
+
+        if not changes.any_changed():
+            print('No changes since last import')
+            return plan
+
+        if meet is None:
+            meet = {'meet_id': meet_ref(), 'events': []}
+
+        self.openmeet_meet = meet
+        self.openmeet_events = meet['events']
+
+        teams = self.get_teams()
+        self.get_athletes(teams)
+        plan.teams_query = self.openmeet_teams_query()
+
+        teams_data = self.fetch_openmeet_teams()
+        teams = self.teams_to_sync(teams, changes)
+        if teams is not None:
+            teams_to_add, members_to_add = self.diff_teams(teams, teams_data)
+            plan.add('teams', teams_to_add)
+            plan.add('athletes', members_to_add)
+            teams_data = self.with_planned_teams(teams_data, teams_to_add, members_to_add)
+
+        self.set_openmeet_teams(teams_data)
+
+        entry_rows = self.entry_rows_to_send(changes)
+        result_rows = self.result_rows_to_send(changes)
+        relay_rows = self.relay_rows_to_send(changes)
+        relay_result_rows = self.relay_result_rows_to_send(changes)
+
+        if not is_ref(meet['meet_id']):
+            self.get_existing_entries(meet['meet_id'])
+
+        if entry_rows is not None:
+            entries = list(self.get_entries(entry_rows))
+            plan.add('entries', entries)
+            plan.add('entry updates', self.get_entry_updates(entry_rows))
+
+            # Later results refer to the planned entries
+            for entry in entries:
+                self.add_openmeet_entry(dict(entry, entry_id=entry_ref(entry['program_number'], entry['athlete_id'])))
+
+        if result_rows is not None:
+            plan.add('results', self.get_individual_results(result_rows))
+
+        if relay_rows is not None:
+            if not is_ref(meet['meet_id']):
+                self.get_existing_relays(meet['meet_id'])
+            plan.add('relay teams', self.get_relay_teams(relay_rows))
+            plan.add('relay updates', self.get_relay_updates(relay_rows))
+
+        if relay_result_rows is not None:
+            plan.add('relay results', self.get_relay_results(relay_result_rows))
+
+        return plan
+
+
+    def resolve_plan_ref(self, ref):
+        kind, *key = parse_ref(ref)
+
+        if kind == 'meet':
+            return self.openmeet_meet['meet_id']
+
+        if kind == 'team':
+            return self.find_openmeet_team(key[0])['team_id']
+
+        if kind == 'athlete':
+            return self.find_openmeet_member(key[0], key[1])['athlete_id']
+
+        if kind == 'entry':
+            athlete_id = self.resolve_plan_ref(key[1]) if is_ref(key[1]) else key[1]
+            return self.find_openmeet_entry(key[0], athlete_id)['entry_id']
+
+        raise KeyError(ref)
+
+
+    def resolve_plan_items(self, step, items):
+        resolved = []
+        unresolved = 0
+
+        for item in items:
+            try:
+                resolved.append(resolve_refs(item, self.resolve_plan_ref))
+            except (KeyError, TypeError):
+                # Refers to a team, athlete or entry that failed to be created
+                unresolved += 1
+
+        if unresolved > 0:
+            print('Skipping %d %s that refer to objects that were not created' % (unresolved, step))
+
+        return resolved, unresolved
+
+
+    def apply_plan(self, plan):
+        print(plan.summary())
+
+        if plan.is_empty():
+            return
+
+        self.openmeet_meet = self.get_openmeet_meet(plan.meet_create)
+        self.openmeet_events = self.openmeet_meet['events']
+
+        # The Hy-Tek tables aren't read when applying, the lookup comes from the plan
+        self.teams_query = plan.teams_query
+        if self.team_lookup and self.teams_query is None:
+            print('Plan has no team lookup query, fetching all teams')
+            self.team_lookup = False
+
+        step_senders = {
+            'teams': lambda items: self.record_upload('teams', self.uploader.post('/teams', items)),
+            'athletes': lambda items: self.record_upload('athletes', self.uploader.post('/athletes', items)),
+            'entries': self.post_entries,
+            'entry updates': self.patch_entries,
+            'results': self.put_individual_results,
+            'relay teams': self.post_relay_teams,
+            'relay updates': self.patch_relay_teams,
+            'relay results': self.put_relay_results,
+        }
+
+        failed_chunks = 0
+        teams_loaded = False
+
+        for step, items in plan.ordered_steps():
+            # Team and athlete IDs are looked up once the plan's teams and athletes exist
+            if step not in ('teams', 'athletes') and not teams_loaded:
+                self.load_openmeet_teams()
+                teams_loaded = True
+
+            with self.profile.phase(step):
+                items, unresolved = self.resolve_plan_items(step, items)
+                # Unresolved items count as failed so the cache sends their rows again
+                failed_chunks += unresolved + step_senders[step](items)
+
+        self.save_changes(plan.meet_create, plan.digests, failed_chunks)
+        self.count_profile_rows()
+
+
+    def count_profile_rows(self):
+        if self.snapshot is not None:
+            for table_name, count in self.snapshot.row_counts().items():
+                self.profile.count_rows('hytek %s' % table_name, count)
+
+        for description, count in self.sent_counts.items():
+            self.profile.count_rows('sent %s' % description, count)
+
+    def open_hytek_db(self):
+        profile = self.profile
+
+        # Extract all Hy-Tek tables, unless a snapshot was handed in
+        if self.snapshot is None:
+            with profile.phase('extract'):
+                self.load_snapshot()
+
+        # Get meet setup data
+        with profile.phase('meet setup'):
+            meet_create = self.get_meet_setup()
+
+        # The cached fingerprints only count when the meet they were saved against still exists
+        with profile.phase('meet'):
+            meet = self.find_openmeet_meet(meet_create)
+
+        with profile.phase('changes'):
+            digests, changes = self.get_changes(meet_create, meet)
+
+        if not changes.any_changed():
+            print('No changes since last import')
+            self.count_profile_rows()
+            return 0
+
+        if meet is None:
+            with profile.phase('meet'):
+                meet = self.create_openmeet_meet(meet_create)
+
+        # TODO: Update Meet Data
+        self.openmeet_meet = meet
+        self.openmeet_events = meet['events']
+
+        # Load teams
+        with profile.phase('teams'):
+            teams = self.get_teams()
+
+        # Load athletes
+        with profile.phase('athletes'):
+            self.get_athletes(teams)
+
+        teams = self.teams_to_sync(teams, changes)
+        if teams is not None:
+            with profile.phase('sync teams'):
+                self.sync_teams(teams)
+
+        entry_rows = self.entry_rows_to_send(changes)
+        result_rows = self.result_rows_to_send(changes)
+        relay_rows = self.relay_rows_to_send(changes)
+        relay_result_rows = self.relay_result_rows_to_send(changes)
+        failed_chunks = 0
+
+        if entry_rows is not None or result_rows is not None or relay_rows is not None \
+                or relay_result_rows is not None:
+            with profile.phase('openmeet teams'):
+                self.load_openmeet_teams()
+
+            # Load entries
+            with profile.phase('existing entries'):
+                self.get_existing_entries(self.openmeet_meet['meet_id'])
+
+        if entry_rows is not None:
+            # Entries are built as the uploader consumes them, chunk by chunk
+            with profile.phase('entries'):
+                failed_chunks += self.post_entries(self.get_entries(entry_rows))
+
+            # Seed time, scratch and team changes to entries already in OpenMeet
+            with profile.phase('entry updates'):
+                failed_chunks += self.patch_entries(self.get_entry_updates(entry_rows))
+            # pprint(self.openmeet_entries_db)
+
+        # Load individual results
+        if result_rows is not None:
+            with profile.phase('results'):
+                individual_results = self.get_individual_results(result_rows)
+                # pprint(individual_results)
+
+                failed_chunks += self.put_individual_results(individual_results)
+
+        # Get DB of all relay teams and members
+        if relay_rows is not None:
+            with profile.phase('existing relays'):
+                self.get_existing_relays(self.openmeet_meet['meet_id'])
+
+            with profile.phase('relays'):
+                relay_teams = self.get_relay_teams(relay_rows)
+
+                failed_chunks += self.post_relay_teams(relay_teams)
+
+            # Seed time, scratch and swimmer changes to relays already in OpenMeet
+            with profile.phase('relay updates'):
+                failed_chunks += self.patch_relay_teams(self.get_relay_updates(relay_rows))
+
+        # Relay results and splits, once the relay teams exist
+        if relay_result_rows is not None:
+            with profile.phase('relay results'):
+                failed_chunks += self.put_relay_results(self.get_relay_results(relay_result_rows))
+
+        with profile.phase('save changes'):
+            self.save_changes(meet_create, digests, failed_chunks)
+
+        self.count_profile_rows()
+
+        return failed_chunks
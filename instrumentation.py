@@ -0,0 +1,99 @@
+from contextlib import contextmanager
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_memory_bytes():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes everywhere else
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class ImportProfile:
+    # Phase timings and row counts for one import run
+
+    def __init__(self):
+        self.phases = {}
+        self.rows = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            count, total = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (count + 1, total + time.perf_counter() - start)
+
+    def count_rows(self, name, count):
+        self.rows[name] = self.rows.get(name, 0) + count
+
+    def merge(self, profile):
+        # Add the phases and rows of another run, such as one meet of a batch
+        for name, (count, total) in profile.phases.items():
+            merged_count, merged_total = self.phases.get(name, (0, 0.0))
+            self.phases[name] = (merged_count + count, merged_total + total)
+
+        for name, count in profile.rows.items():
+            self.count_rows(name, count)
+
+    def report(self, client=None):
+        report = {
+            'elapsed_seconds': time.perf_counter() - self.started,
+            'peak_memory_bytes': peak_memory_bytes(),
+            'phases': {name: {'calls': count, 'seconds': total} for name, (count, total) in self.phases.items()},
+            'rows': dict(self.rows),
+        }
+
+        if client is not None:
+            report['endpoints'] = client.endpoint_stats()
+
+        return report
+
+    def report_text(self, client=None):
+        report = self.report(client)
+        lines = ['Elapsed %.3fs' % report['elapsed_seconds']]
+
+        if report['peak_memory_bytes'] is not None:
+            lines.append('Peak memory %.1f MiB' % (report['peak_memory_bytes'] / 1048576))
+
+        lines.append('')
+        lines.append('Phases')
+        for name, phase in report['phases'].items():
+            lines.append('  %-24s %9.3fs' % (name, phase['seconds']))
+
+        lines.append('')
+        lines.append('Rows')
+        for name, count in sorted(report['rows'].items()):
+            lines.append('  %-24s %9d' % (name, count))
+
+        if 'endpoints' in report:
+            lines.append('')
+            lines.append('Endpoints')
+            for name, endpoint in sorted(report['endpoints'].items()):
+                lines.append('  %-32s %5d calls %9.3fs %12d B sent %12d B received' % (name, endpoint['calls'],
+                                                                                          endpoint['seconds'],
+                                                                                          endpoint['bytes_sent'],
+                                                                                          endpoint['bytes_received']))
+
+        return '\n'.join(lines)
+
+    def write_report(self, path, client=None):
+        if path == '-':
+            print(self.report_text(client))
+        elif path.split('.')[-1] == 'json':
+            with open(path, 'w') as report_file:
+                json.dump(self.report(client), report_file, indent=2)
+        else:
+            with open(path, 'w') as report_file:
+                report_file.write(self.report_text(client) + '\n')
@@ -0,0 +1,36 @@
+# JSON encoding and decoding through orjson when it is installed, otherwise the standard
+# library. Encoding always produces bytes, ready to compress or send.
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(value):
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_lines(lines):
+    # Decode a batch of JSON lines with a single parser call by joining them into one array
+    lines = [x for x in lines if x.strip()]
+    if len(lines) == 0:
+        return []
+    return loads(b'[' + b','.join(lines) + b']')
+
+
+def response_json(response):
+    # Decode a response body with the fast backend rather than requests' own json()
+    return loads(response.content)
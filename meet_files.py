@@ -0,0 +1,150 @@
+from zipfile import ZipFile, BadZipFile
+import getpass
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+
+MEET_FILE_EXTENSIONS = ('zip', 'mdb')
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Extracted databases kept for reuse, and how long an abandoned partial extraction is left
+EXTRACT_CACHE_SIZE = 4
+STALE_PART_SECONDS = 3600
+
+
+def file_extension(path):
+    return path.split('.')[-1].lower()
+
+
+def private_temp_root():
+    # Prefer a memory backed filesystem so extracted databases never touch the disk
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm'
+    return tempfile.gettempdir()
+
+
+def default_extract_dir():
+    # getuser() fails in containers running as a uid with no passwd entry or login variables
+    try:
+        user = getpass.getuser()
+    except (KeyError, OSError):
+        user = str(os.getuid())
+    return os.path.join(private_temp_root(), 'openmeet-hytek-%s' % user)
+
+
+def make_private_dir(path):
+    os.makedirs(path, mode=0o700, exist_ok=True)
+
+    # The temp root is shared, don't use a directory someone else created first
+    if hasattr(os, 'getuid') and os.stat(path).st_uid != os.getuid():
+        raise RuntimeError('%s is not owned by the current user' % path)
+
+    return path
+
+
+def private_temp_dir(prefix):
+    return tempfile.mkdtemp(prefix=prefix, dir=private_temp_root())
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(COPY_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def find_mdb_member(zip_file):
+    for zip_info in zip_file.infolist():
+        if file_extension(zip_info.filename) == 'mdb':
+            return zip_info
+    return None
+
+
+def stream_member(zip_file, zip_info, target_path):
+    # Stream the member into a temp file beside target_path and rename it into place, so
+    # concurrent extractions never see a partial file. Reading a member to the end checks
+    # its CRC, a corrupt backup raises BadZipFile.
+    fd, part_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(target_path))
+
+    try:
+        with os.fdopen(fd, 'wb') as part_file, zip_file.open(zip_info) as member:
+            shutil.copyfileobj(member, part_file, COPY_BUFFER_SIZE)
+
+        if os.path.getsize(part_path) != zip_info.file_size:
+            raise BadZipFile('%s is truncated' % zip_info.filename)
+
+        os.replace(part_path, target_path)
+    except BaseException:
+        os.remove(part_path)
+        raise
+
+    return target_path
+
+
+def extract_mdb(zip_path, target_dir):
+    # Extract the first Meet Manager database in a backup zip into target_dir
+    with ZipFile(zip_path) as zip_file:
+        zip_info = find_mdb_member(zip_file)
+        if zip_info is None:
+            return None
+
+        return stream_member(zip_file, zip_info, os.path.join(target_dir, os.path.basename(zip_info.filename)))
+
+
+def extract_mdb_cached(zip_path, cache_dir=None, cache_size=EXTRACT_CACHE_SIZE):
+    # Extract into cache_dir named by the archive's hash, reusing the database extracted by an
+    # earlier run when the archive hasn't changed
+    if cache_dir is None:
+        cache_dir = default_extract_dir()
+    make_private_dir(cache_dir)
+    target_path = os.path.join(cache_dir, file_digest(zip_path) + '.mdb')
+
+    if os.path.exists(target_path):
+        # Mark it recently used so it outlives older extractions
+        os.utime(target_path)
+        return target_path
+
+    with ZipFile(zip_path) as zip_file:
+        zip_info = find_mdb_member(zip_file)
+        if zip_info is None:
+            return None
+
+        stream_member(zip_file, zip_info, target_path)
+
+    evict_extracted(cache_dir, cache_size)
+
+    return target_path
+
+
+def evict_extracted(cache_dir, cache_size=EXTRACT_CACHE_SIZE):
+    extracted = sorted(glob.glob(os.path.join(cache_dir, '*.mdb')), key=os.path.getmtime, reverse=True)
+    stale_parts = [x for x in glob.glob(os.path.join(cache_dir, '*.part'))
+                   if os.path.getmtime(x) < time.time() - STALE_PART_SECONDS]
+
+    for path in extracted[cache_size:] + stale_parts:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def find_meet_files(paths):
+    # Expand directories and glob patterns into a sorted list of .zip and .mdb files
+    meet_files = set()
+
+    for path in paths:
+        if os.path.isdir(path):
+            candidates = glob.glob(os.path.join(path, '*'))
+        else:
+            candidates = glob.glob(path)
+
+        for candidate in candidates:
+            if os.path.isfile(candidate) and file_extension(candidate) in MEET_FILE_EXTENSIONS:
+                meet_files.add(candidate)
+
+    return sorted(meet_files)
@@ -0,0 +1,186 @@
+import gzip
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from json_codec import dumps, response_json
+
+DEFAULT_BASE_URL = os.environ.get('OPENMEET_URL', 'http://localhost:8000')
+
+# Responses worth retrying, anything else is returned to the caller straight away
+TRANSIENT_STATUS_CODES = (502, 503, 504)
+
+# Only these are sent again once the server may have seen them, a repeated POST could create duplicates
+IDEMPOTENT_METHODS = ('GET', 'PUT', 'PATCH')
+
+# Responses from servers that don't accept gzip request bodies
+COMPRESSION_REJECTED_STATUS_CODES = (400, 415)
+
+
+def request_sent(error):
+    # False when the connection failed before any of the request was sent
+    if isinstance(error, requests.ConnectTimeout):
+        return False
+    reason = getattr(error.args[0], 'reason', None) if len(error.args) > 0 else None
+    return not isinstance(reason, NewConnectionError)
+
+
+class OpenMeetClient:
+    # Pooled HTTP session for the OpenMeet API
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, retries=3, backoff=0.5, compress=False,
+                 compress_min_size=1024, timeout=120, pool_size=10):
+        self.base_url = base_url.rstrip('/')
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+        self.timeout = timeout
+        self.latencies = {}
+        self.transfers = {}
+        # Upload workers and batch imports record stats from several threads
+        self.stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json', 'Accept-Encoding': 'gzip, deflate'})
+
+    def encode_payload(self, payload, compress=None):
+        body = dumps(payload)
+        headers = {'Content-Type': 'application/json'}
+
+        if compress is None:
+            compress = self.compress
+
+        if compress and len(body) >= self.compress_min_size:
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        return body, headers
+
+    def endpoint_name(self, method, path):
+        return '%s %s' % (method, re.sub(r'/\d+', '/{id}', path))
+
+    def record_latency(self, endpoint, elapsed):
+        with self.stats_lock:
+            count, total, slowest = self.latencies.get(endpoint, (0, 0.0, 0.0))
+            self.latencies[endpoint] = (count + 1, total + elapsed, max(slowest, elapsed))
+
+    def record_transfer(self, endpoint, bytes_sent, bytes_received):
+        with self.stats_lock:
+            sent, received = self.transfers.get(endpoint, (0, 0))
+            self.transfers[endpoint] = (sent + bytes_sent, received + bytes_received)
+
+    def can_retry(self, method, attempt, sent=True):
+        # Requests the server may have seen are only sent again when that is safe
+        return attempt < self.retries and (not sent or method in IDEMPOTENT_METHODS)
+
+    def compression_rejected(self, headers, status_code):
+        if headers.get('Content-Encoding') != 'gzip' or status_code not in COMPRESSION_REJECTED_STATUS_CODES:
+            return False
+
+        # 415 means the server can't read gzip at all, so stop compressing for the rest of the run
+        if status_code == 415:
+            self.compress = False
+        return True
+
+    def request(self, method, path, payload=None, params=None):
+        body = None
+        headers = {}
+        if payload is not None:
+            body, headers = self.encode_payload(payload)
+
+        response = self.send(method, path, body, headers, params)
+
+        if self.compression_rejected(headers, response.status_code):
+            body, headers = self.encode_payload(payload, compress=False)
+            response = self.send(method, path, body, headers, params)
+
+        return response
+
+    def send(self, method, path, body, headers, params):
+        endpoint = self.endpoint_name(method, path)
+        url = self.base_url + path
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, data=body, params=params, headers=headers,
+                                                timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.record_latency(endpoint, time.perf_counter() - start)
+                if not self.can_retry(method, attempt, request_sent(e)):
+                    raise
+            else:
+                self.record_latency(endpoint, time.perf_counter() - start)
+                self.record_transfer(endpoint, len(body) if body is not None else 0,
+                                     int(response.headers.get('Content-Length', len(response.content))))
+                if response.status_code not in TRANSIENT_STATUS_CODES or not self.can_retry(method, attempt):
+                    return response
+
+            time.sleep(self.backoff * (2 ** attempt))
+            attempt += 1
+
+    def get(self, path, params=None):
+        return self.request('GET', path, params=params)
+
+    def post(self, path, payload):
+        return self.request('POST', path, payload=payload)
+
+    def put(self, path, payload):
+        return self.request('PUT', path, payload=payload)
+
+    def patch(self, path, payload):
+        return self.request('PATCH', path, payload=payload)
+
+    def endpoint_stats(self):
+        stats = {}
+        with self.stats_lock:
+            latencies = dict(self.latencies)
+            transfers = dict(self.transfers)
+        for endpoint, (count, total, slowest) in latencies.items():
+            sent, received = transfers.get(endpoint, (0, 0))
+            stats[endpoint] = {'calls': count, 'seconds': total, 'slowest_seconds': slowest,
+                               'bytes_sent': sent, 'bytes_received': received}
+        return stats
+
+    def latency_report(self):
+        lines = []
+        with self.stats_lock:
+            latencies = sorted(self.latencies.items())
+        for endpoint, (count, total, slowest) in latencies:
+            lines.append('%-32s %5d calls %9.3fs total %8.3fs avg %8.3fs max' % (endpoint, count, total,
+                                                                                 total / count, slowest))
+        return '\n'.join(lines)
+
+    def close(self):
+        self.session.close()
+
+
+class TeamsView:
+    # Copy of GET /teams shared by importers running in the same process. Holding
+    # lock while diffing and posting stops two meets adding the same team.
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.RLock()
+        self.teams = None
+
+    def get(self):
+        with self.lock:
+            if self.teams is None:
+                response = self.client.get('/teams')
+                self.teams = response_json(response)['data']
+            return self.teams
+
+    def invalidate(self):
+        with self.lock:
+            self.teams = None
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from hytek_records import to_records
+
+HYTEK_TABLES = ['meet', 'event', 'team', 'athlete', 'entry', 'relay', 'relaynames', 'split']
+
+
+class HytekSnapshot:
+    # All table rows read from a Hy-Tek database for a single import run
+
+    def __init__(self, tables):
+        self.tables = tables
+
+    def table(self, table_name):
+        return self.tables[table_name]
+
+    def row_counts(self):
+        return {table_name: len(rows) for table_name, rows in self.tables.items()}
+
+
+def extract_snapshot(reader, tables=None, max_workers=None):
+    if tables is None:
+        tables = HYTEK_TABLES
+
+    # Readers that run in process gain nothing from threads, only mdb-json subprocesses overlap
+    if not getattr(reader, 'concurrent', False):
+        max_workers = 1
+    elif max_workers is None:
+        max_workers = len(tables)
+
+    def read_table(table_name):
+        return to_records(table_name, reader.read_table(table_name))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        rows = executor.map(read_table, tables)
+        return HytekSnapshot(dict(zip(tables, rows)))
@@ -0,0 +1,110 @@
+import datetime
+import subprocess
+
+from date_helper import HYTEK_DATE_FORMAT
+from json_codec import loads_lines
+
+try:
+    from access_parser import AccessParser
+except ImportError:
+    AccessParser = None
+
+NATIVE_BACKEND = 'native'
+MDB_JSON_BACKEND = 'mdb-json'
+
+# mdb-json output is decoded a block of lines at a time
+READ_BLOCK_SIZE = 1024 * 1024
+
+
+class MdbJsonReader:
+    # Reads tables by streaming the output of the mdbtools mdb-json command
+
+    name = MDB_JSON_BACKEND
+    concurrent = True
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+
+    def read_table(self, table_name):
+        process = subprocess.Popen(['mdb-json', self.db_file, table_name], stdout=subprocess.PIPE)
+
+        try:
+            yield from read_json_lines(process.stdout)
+        finally:
+            process.stdout.close()
+            process.wait()
+
+
+class NativeReader:
+    # Reads the Jet pages of the database in process using access_parser
+
+    name = NATIVE_BACKEND
+    concurrent = False
+
+    def __init__(self, db_file):
+        if AccessParser is None:
+            raise RuntimeError('The native reader requires the access_parser package')
+
+        self.db_file = db_file
+        self.db = None
+
+    def find_table_name(self, table_name):
+        # mdb-json matches table names case insensitively, do the same here
+        for catalog_name in self.db.catalog:
+            if catalog_name.lower() == table_name.lower():
+                return catalog_name
+        return table_name
+
+    def read_table(self, table_name):
+        if self.db is None:
+            self.db = AccessParser(self.db_file)
+
+        columns = self.db.parse_table(self.find_table_name(table_name))
+        names = list(columns.keys())
+
+        for values in zip(*columns.values()):
+            row = {}
+            for name, value in zip(names, values):
+                # mdb-json leaves null columns out of the row
+                if value is None:
+                    continue
+                row[name] = to_mdb_json_value(value)
+            yield row
+
+
+def read_json_lines(stream, block_size=READ_BLOCK_SIZE):
+    # Rows from a binary stream of JSON lines
+    pending = b''
+    for block in iter(lambda: stream.read(block_size), b''):
+        lines = (pending + block).split(b'\n')
+        # The last line may be cut off, it is finished by the next block
+        pending = lines.pop()
+        yield from loads_lines(lines)
+
+    yield from loads_lines([pending])
+
+
+def to_mdb_json_value(value):
+    # Convert values into the same representation mdb-json produces
+    if isinstance(value, datetime.datetime):
+        return value.strftime(HYTEK_DATE_FORMAT)
+
+    if isinstance(value, str) and len(value) >= 19 and value[4] == '-' and value[10] == 'T':
+        try:
+            return datetime.datetime.fromisoformat(value).strftime(HYTEK_DATE_FORMAT)
+        except ValueError:
+            return value
+
+    return value
+
+
+def get_table_reader(db_file, backend=None):
+    if backend is None:
+        backend = NATIVE_BACKEND if AccessParser is not None else MDB_JSON_BACKEND
+
+    if backend == NATIVE_BACKEND:
+        return NativeReader(db_file)
+    if backend == MDB_JSON_BACKEND:
+        return MdbJsonReader(db_file)
+
+    raise ValueError('Unknown table reader backend %s' % backend)
@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+
+from date_helper import get_hytek_dob, get_hytek_dobs, parse_hytek_dates, set_reference_date
+
+
+@pytest.fixture(autouse=True)
+def reference_date():
+    set_reference_date(datetime.date(2024, 6, 1))
+    yield
+    set_reference_date(None)
+
+
+def test_two_digit_years_in_the_future_are_the_previous_century():
+    assert get_hytek_dob('03/15/30 00:00:00') == datetime.datetime(1930, 3, 15)
+    assert get_hytek_dob('03/15/10 00:00:00') == datetime.datetime(2010, 3, 15)
+
+
+def test_century_depends_on_the_reference_date():
+    assert get_hytek_dob('06/15/24 00:00:00') == datetime.datetime(1924, 6, 15)
+    assert get_hytek_dob('06/15/24 00:00:00', datetime.date(2025, 1, 1)) == datetime.datetime(2024, 6, 15)
+
+
+def test_batch_conversions_keep_order_and_duplicates():
+    dates = ['03/15/30 00:00:00', '01/02/99 00:00:00', '03/15/30 00:00:00']
+    assert get_hytek_dobs(dates) == [datetime.datetime(1930, 3, 15), datetime.datetime(1999, 1, 2),
+                                     datetime.datetime(1930, 3, 15)]
+    assert parse_hytek_dates(dates) == [datetime.datetime(2030, 3, 15), datetime.datetime(1999, 1, 2),
+                                        datetime.datetime(2030, 3, 15)]
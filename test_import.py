@@ -0,0 +1,126 @@
+import pytest
+
+from benchmarks.synthetic_meet import generate_meet_tables, SyntheticReader
+from bulk_upload import BulkUploader
+from fake_openmeet import FakeOpenMeetServer
+from import_cache import ImportCache
+from import_plan import ImportPlan
+from importer import HytekDbImporter
+from openmeet_client import OpenMeetClient
+
+
+@pytest.fixture
+def tables():
+    return generate_meet_tables(1)
+
+
+@pytest.fixture
+def server():
+    with FakeOpenMeetServer() as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    client = OpenMeetClient(server.base_url)
+    yield client
+    client.close()
+
+
+def make_importer(tables, client, cache=None, **kwargs):
+    return HytekDbImporter('synthetic.mdb', SyntheticReader(tables), cache, client, BulkUploader(client, 100, 2),
+                           **kwargs)
+
+
+def meet_counts(state):
+    return {
+        'meets': len(state.meets),
+        'teams': len(state.teams),
+        'athletes': sum(len(x['members']) for x in state.teams),
+        'entries': sum(len(x) for x in state.entries.values()),
+        'results': sum(len(x) for x in state.results.values()),
+        'relays': sum(len(x) for x in state.relays.values()),
+        'relay results': sum(len(x) for x in state.relay_results.values()),
+    }
+
+
+def expected_counts(tables):
+    return {
+        'meets': 1,
+        'teams': len(tables['team']),
+        'athletes': len(tables['athlete']),
+        'entries': len(tables['entry']),
+        'results': sum(1 for x in tables['entry'] if x.get('Fin_Time') is not None),
+        'relays': len(tables['relay']),
+        'relay results': len(tables['relay']),
+    }
+
+
+def requests_since(server, start):
+    return [(method, path) for method, path, size in server.state.requests[start:]]
+
+
+def test_first_import(tables, server, client):
+    assert make_importer(tables, client).open_hytek_db() == 0
+    assert meet_counts(server.state) == expected_counts(tables)
+
+
+def test_unchanged_rerun_sends_nothing(tables, server, client, tmp_path):
+    cache = ImportCache(str(tmp_path / 'cache.sqlite'))
+    make_importer(tables, client, cache).open_hytek_db()
+
+    start = len(server.state.requests)
+    assert make_importer(tables, client, cache).open_hytek_db() == 0
+    cache.close()
+
+    assert [method for method, path in requests_since(server, start)] == ['GET']
+    assert meet_counts(server.state) == expected_counts(tables)
+
+
+def test_team_lookup(tables, server, client):
+    make_importer(tables, client, team_lookup=True).open_hytek_db()
+
+    paths = [path for method, path in requests_since(server, 0)]
+    assert '/teams/lookup' in paths
+    assert '/teams' not in [path for method, path in requests_since(server, 0) if method == 'GET']
+    assert meet_counts(server.state) == expected_counts(tables)
+
+
+def test_entry_updates(tables, server, client, tmp_path):
+    cache = ImportCache(str(tmp_path / 'cache.sqlite'))
+    make_importer(tables, client, cache).open_hytek_db()
+
+    tables['entry'][0]['Scr_stat'] = True
+    tables['entry'][1]['ConvSeed_time'] = 61.23
+    tables['relay'][0]['Scr_stat'] = True
+    importer = make_importer(tables, client, cache)
+    assert importer.open_hytek_db() == 0
+    cache.close()
+
+    assert importer.sent_counts['entries'] == 0
+    assert importer.sent_counts['entry updates'] == 2
+    assert importer.sent_counts['relay teams'] == 0
+    assert importer.sent_counts['relay updates'] == 1
+    assert meet_counts(server.state) == expected_counts(tables)
+
+    entries = list(server.state.entries.values())[0]
+    assert sum(1 for x in entries if x['seed_time'] == 61.23) == 1
+    assert list(server.state.relays.values())[0][0]['scratched']
+
+
+def test_plan_then_apply(tables, server, client, tmp_path):
+    start = len(server.state.requests)
+    plan = make_importer(tables, client).build_plan()
+    assert set(method for method, path in requests_since(server, start)) == {'GET'}
+
+    plan_file = str(tmp_path / 'plan.json.gz')
+    plan.write(plan_file)
+
+    importer = HytekDbImporter(None, client=client, uploader=BulkUploader(client, 100, 2))
+    importer.apply_plan(ImportPlan.read(plan_file))
+
+    assert meet_counts(server.state) == expected_counts(tables)
+
+    # Planning again finds everything but the results already in OpenMeet
+    replan = make_importer(tables, client).build_plan()
+    assert set(replan.steps) <= {'results', 'relay results'}
@@ -0,0 +1,225 @@
+import glob
+import os
+import shutil
+import time
+
+from table_reader import get_table_reader
+from snapshot import extract_snapshot
+from instrumentation import ImportProfile
+from meet_files import extract_mdb_cached, file_extension, private_temp_dir
+
+RESULT_FIELDS = ['Fin_Time', 'Fin_pad', 'Fin_back1', 'Fin_back2', 'Fin_back3']
+
+# A change to any of these tables needs a full import rather than a results push. Relay
+# rows also hold results, so only their other columns are compared.
+STRUCTURE_TABLES = ['meet', 'event', 'team', 'athlete', 'relaynames']
+
+
+def result_key(entry_row):
+    return entry_row.Event_ptr, entry_row.Ath_no
+
+
+def relay_key(relay_row):
+    return relay_row.Relay_no
+
+
+def split_key(split_row):
+    return split_row.Event_ptr, split_row.Ath_no, split_row.Relay_no, split_row.Rnd_ltr, split_row.Split_no
+
+
+def result_values(row):
+    return tuple(getattr(row, field) for field in RESULT_FIELDS)
+
+
+def structure_values(row):
+    return tuple(getattr(row, field) for field in row.__slots__ if field not in RESULT_FIELDS)
+
+
+def changed_result_rows(previous_rows, current_rows, key=result_key, changed_keys=()):
+    # Rows whose result columns changed, plus those named in changed_keys
+    previous_results = {key(x): result_values(x) for x in previous_rows}
+
+    for row in current_rows:
+        if key(row) in changed_keys or previous_results.get(key(row)) != result_values(row):
+            yield row
+
+
+def changed_entry_rows(previous_rows, current_rows):
+    # Entries whose seed time, scratch or other non-result columns changed
+    previous_entries = {result_key(x): structure_values(x) for x in previous_rows}
+
+    for row in current_rows:
+        if previous_entries.get(result_key(row)) != structure_values(row):
+            yield row
+
+
+def changed_split_owners(previous_rows, current_rows):
+    # Individual swims (Event_ptr, Ath_no) and relays (Relay_no) with new or changed splits
+    previous_splits = set(x.values() for x in previous_rows)
+    entry_keys = set()
+    relay_nos = set()
+
+    for split_row in current_rows:
+        if split_row.values() not in previous_splits:
+            if split_row.Relay_no:
+                relay_nos.add(split_row.Relay_no)
+            else:
+                entry_keys.add(result_key(split_row))
+
+    return entry_keys, relay_nos
+
+
+def needs_full_import(previous_snapshot, current_snapshot):
+    for table_name in STRUCTURE_TABLES:
+        if previous_snapshot.table(table_name) != current_snapshot.table(table_name):
+            return True
+
+    previous_relays = [structure_values(x) for x in previous_snapshot.table('relay')]
+    if previous_relays != [structure_values(x) for x in current_snapshot.table('relay')]:
+        return True
+
+    previous_entries = set(result_key(x) for x in previous_snapshot.table('entry'))
+    current_entries = set(result_key(x) for x in current_snapshot.table('entry'))
+
+    return previous_entries != current_entries
+
+
+class ResultsWatcher:
+    # Polls a Meet Manager database, or a directory of backup zips, and pushes changed results
+
+    def __init__(self, source, importer_class, client, uploader, reader_backend=None, interval=60, team_lookup=False):
+        self.source = source
+        self.importer_class = importer_class
+        self.client = client
+        self.uploader = uploader
+        self.reader_backend = reader_backend
+        self.interval = interval
+        self.team_lookup = team_lookup
+        # Timings and row counts of every import and push while watching
+        self.profile = ImportProfile()
+        self.importer = None
+        self.last_signature = None
+        self.work_dir = private_temp_dir('hytek-watch-')
+
+    def find_latest_source(self):
+        if os.path.isdir(self.source):
+            backups = glob.glob(os.path.join(self.source, '*.zip'))
+            if len(backups) == 0:
+                return None
+            return max(backups, key=os.path.getmtime)
+        return self.source
+
+    def source_signature(self, path):
+        stat = os.stat(path)
+        return path, stat.st_mtime_ns, stat.st_size
+
+    def full_import(self, data_file, snapshot):
+        print('Full import of %s' % data_file)
+        importer = self.importer_class(data_file, get_table_reader(data_file, self.reader_backend),
+                                       client=self.client, uploader=self.uploader, team_lookup=self.team_lookup)
+        importer.profile = self.profile
+        importer.load_snapshot(snapshot)
+
+        # The previous importer is kept, so the next poll tries the full import again
+        if importer.open_hytek_db() > 0:
+            return False
+
+        self.importer = importer
+        return True
+
+    def push_results(self, snapshot):
+        previous_snapshot = self.importer.snapshot
+        entry_keys, relay_nos = changed_split_owners(previous_snapshot.table('split'), snapshot.table('split'))
+        changed_rows = list(changed_result_rows(previous_snapshot.table('entry'), snapshot.table('entry'),
+                                                result_key, entry_keys))
+        changed_relays = list(changed_result_rows(previous_snapshot.table('relay'), snapshot.table('relay'),
+                                                  relay_key, relay_nos))
+        changed_entries = list(changed_entry_rows(previous_snapshot.table('entry'), snapshot.table('entry')))
+
+        # Results are built from the new snapshot's splits
+        self.importer.load_snapshot(snapshot)
+
+        if len(changed_rows) == 0 and len(changed_relays) == 0 and len(changed_entries) == 0:
+            print('No changed results')
+            return True
+
+        sent = False
+        try:
+            entry_updates = list(self.importer.get_entry_updates(changed_entries))
+            individual_results = list(self.importer.get_individual_results(changed_rows))
+            relay_results = list(self.importer.get_relay_results(changed_relays))
+
+            failed_chunks = 0
+            with self.profile.phase('push results'):
+                # Seed times and scratches change during warm-up, between the full imports
+                if len(entry_updates) > 0:
+                    failed_chunks += self.importer.patch_entries(entry_updates)
+                if len(individual_results) > 0:
+                    failed_chunks += self.importer.put_individual_results(individual_results)
+                if len(relay_results) > 0:
+                    failed_chunks += self.importer.put_relay_results(relay_results)
+
+            sent = failed_chunks == 0
+        finally:
+            if not sent:
+                # Keep the previous snapshot so the failed results are sent again next poll
+                self.importer.load_snapshot(previous_snapshot)
+
+        if not sent:
+            return False
+
+        self.profile.count_rows('sent entry updates', len(entry_updates))
+        self.profile.count_rows('sent results', len(individual_results))
+        self.profile.count_rows('sent relay results', len(relay_results))
+
+        print('Pushed %d entry updates, %d changed results and %d changed relay results' % (
+            len(entry_updates), len(individual_results), len(relay_results)))
+        return True
+
+    def poll(self):
+        try:
+            return self.poll_source()
+        except (Exception, SystemExit) as e:
+            # A half written backup, a failed read or an API error is tried again next poll
+            print('Poll of %s failed: %r' % (self.source, e))
+            return False
+
+    def poll_source(self):
+        path = self.find_latest_source()
+        if path is None:
+            return False
+
+        signature = self.source_signature(path)
+        if signature == self.last_signature:
+            return False
+
+        data_file = path
+        if file_extension(path) == 'zip':
+            # A backup with the same contents as the last one is not extracted again
+            data_file = extract_mdb_cached(path, self.work_dir, cache_size=2)
+        if data_file is None:
+            print('No Meet Manager database found in %s' % path)
+            self.last_signature = signature
+            return False
+
+        snapshot = extract_snapshot(get_table_reader(data_file, self.reader_backend))
+
+        if self.importer is None or needs_full_import(self.importer.snapshot, snapshot):
+            if not self.full_import(data_file, snapshot):
+                return False
+        elif not self.push_results(snapshot):
+            return False
+
+        self.last_signature = signature
+        return True
+
+    def run(self):
+        print('Watching %s every %d seconds' % (self.source, self.interval))
+        try:
+            while True:
+                self.poll()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print('Stopped watching')
+        finally:
+            shutil.rmtree(self.work_dir, ignore_errors=True)